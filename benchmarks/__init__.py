@@ -0,0 +1,30 @@
+"""
+Benchmarks
+==========
+
+Suite de mesures de performances et de précision de la bibliothèque
+`isslib`, au format asv (airspeed velocity) : méthodes `time_*` chronométrées
+et méthodes `track_*` enregistrant une valeur (précision, débit).
+
+Les mesures s'exécutent hors ligne sur les fichiers sources fournis dans le
+répertoire `data`. Exécution avec asv dans l'environnement courant :
+
+    asv run -E existing --set-commit-hash $(git rev-parse HEAD)
+
+ou, sans asv, avec le lanceur minimal du package :
+
+    python -m benchmarks [filtre]
+"""
+import glob
+import os
+import sys
+
+# Racine du dépôt, ajoutée aux chemins d'import pour mesurer l'arbre courant
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Fichiers sources fournis, le premier servant de référence
+DATA_FILES = sorted(glob.glob(os.path.join(ROOT, "data",
+                                           "ISS.OEM_J2K_EPH_*.txt")))
+DATA_FILE = DATA_FILES[0]
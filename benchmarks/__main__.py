@@ -0,0 +1,87 @@
+"""
+Lanceur minimal des mesures, sans asv.
+
+Usage : `python -m benchmarks [filtre]`, où le filtre optionnel est une
+sous-chaîne du nom complet des mesures (`module.Classe.methode`). Les
+mesures en échec (contrôles de précision hors tolérance) sont signalées, et
+le code de sortie est alors non nul.
+"""
+import importlib
+import inspect
+import itertools
+import pkgutil
+import subprocess
+import sys
+import timeit
+
+import benchmarks
+
+
+def _cases(cls):
+    """Combinaisons de paramètres d'une classe de mesures."""
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    # Un unique paramètre peut être fourni sous forme de liste simple
+    if not isinstance(params[0], (list, tuple)):
+        params = [params]
+    return list(itertools.product(*params))
+
+
+def _run(name, cls, method, args):
+    """Exécution d'une mesure pour une combinaison de paramètres."""
+    bench = cls()
+    if hasattr(bench, 'setup'):
+        bench.setup(*args)
+    function = getattr(bench, method)
+    label = f"{name}{list(args) if args else ''}"
+    if method.startswith('time_'):
+        timer = timeit.Timer(lambda: function(*args))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=3, number=number)) / number
+        print(f"{label:<70} {best * 1e3:12.4f} ms")
+    elif method.startswith('timeraw_'):
+        # Code chronométré dans un nouvel interpréteur, comme avec asv
+        setup, statement = function(*args)
+        code = (f"import time\n{setup}\nstart = time.perf_counter()\n"
+                f"{statement}\nprint(time.perf_counter() - start)")
+        best = min(float(subprocess.run(
+            [sys.executable, '-c', code], check=True, capture_output=True,
+            text=True).stdout) for _ in range(3))
+        print(f"{label:<70} {best * 1e3:12.4f} ms")
+    else:
+        unit = getattr(function, 'unit', '')
+        print(f"{label:<70} {function(*args):12.6g} {unit}")
+    if hasattr(bench, 'teardown'):
+        bench.teardown(*args)
+
+
+def main(pattern=''):
+    """Exécution des mesures dont le nom contient `pattern`.
+
+    Retourne le nombre de mesures en échec.
+    """
+    failures = 0
+    for info in pkgutil.iter_modules(benchmarks.__path__):
+        if info.name.startswith('_'):
+            continue
+        module = importlib.import_module(f"benchmarks.{info.name}")
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for method in sorted(vars(cls)):
+                name = f"{info.name}.{cls_name}.{method}"
+                if (method.startswith(('time_', 'timeraw_', 'track_'))
+                        and pattern in name):
+                    for args in _cases(cls):
+                        try:
+                            _run(name, cls, method, args)
+                        except AssertionError as error:
+                            failures += 1
+                            print(f"{name}{list(args) if args else ''} "
+                                  f"FAILED: {error}")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main(*sys.argv[1:2]) else 0)
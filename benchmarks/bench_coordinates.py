@@ -0,0 +1,157 @@
+"""Conversions de coordonnées sur de grands tableaux."""
+import numpy as np
+import pandas as pd
+
+from isslib import coordinates
+
+
+class Conversions:
+    """Débit des conversions de coordonnées vectorisées."""
+
+    params = [10_000, 1_000_000]
+    param_names = ['size']
+
+    def setup(self, size):
+        rng = np.random.default_rng(0)
+        self.xyz = rng.normal(size=(3, size)) * 6800
+        self.angles = rng.uniform(-50, 50, size)
+        self.out = tuple(np.empty(size) for _ in range(3))
+        self.matrices = np.broadcast_to(
+            coordinates.celestial2terrestrial_matrices(
+                pd.Timestamp('2023-04-20')), (size, 3, 3))
+        self.rotated = np.empty((3, size))
+
+    def time_pi_interval(self, size):
+        coordinates.pi_interval(self.angles, out=self.out[0])
+
+    def time_positive_pi(self, size):
+        coordinates.positive_pi(self.angles, out=self.out[0])
+
+    def time_cartesian2spherical(self, size):
+        coordinates.cartesian2spherical(*self.xyz, out=self.out)
+
+    def time_spherical2cartesian(self, size):
+        coordinates.spherical2cartesian(
+            *coordinates.cartesian2spherical(*self.xyz), out=self.out)
+
+    def time_rotate_vectors(self, size):
+        coordinates.rotate_vectors(self.matrices, self.xyz, out=self.rotated)
+
+
+class ConversionAccuracy:
+    """Ecarts des conversions rapides aux calculs d'astropy."""
+
+    def setup(self):
+        rng = np.random.default_rng(0)
+        self.xyz = rng.normal(size=(3, 2000)) * 6800
+        self.datetimes = pd.date_range('2023-04-20', periods=2000,
+                                       freq='30s')
+
+    def track_cartesian2spherical_error(self):
+        from astropy.coordinates import GCRS, SkyCoord
+        import astropy.units as units
+        sph = SkyCoord(*self.xyz, frame=GCRS, unit=units.km,
+                       representation_type='cartesian').spherical
+        r, lon, lat = coordinates.cartesian2spherical(*self.xyz)
+        return max(np.abs(r - sph.distance.km).max(),
+                   np.abs(lon - sph.lon.rad).max() * 6800,
+                   np.abs(lat - sph.lat.rad).max() * 6800) * 1e3
+    track_cartesian2spherical_error.unit = "m"
+
+    def track_rotation_table_error(self):
+        # Ecart de la table de rotation au calcul exact d'astropy
+        t0 = self.datetimes[0]
+        rotation = coordinates.EarthRotation(t0, 86400)
+        t = (self.datetimes - t0).total_seconds().to_numpy()
+        exact = np.array(coordinates.celestial2terrestrial(
+            *self.xyz, self.datetimes))
+        table = coordinates.rotate_vectors(rotation.matrix(t), self.xyz)
+        return np.linalg.norm(table - exact, axis=0).max() * 1e3
+    track_rotation_table_error.unit = "m"
+
+
+class RotationTableCheck:
+    """Contrôle de la table de rotation terrestre sur des dates aléatoires.
+
+    Les matrices interpolées (`EarthRotation.matrix`, vectorisée et
+    scalaire) appliquées par `rotate_vectors` sont comparées aux matrices
+    exactes de `celestial2terrestrial_matrices`. L'erreur d'interpolation
+    linéaire croissant comme le carré du pas, la mesure échoue si l'écart
+    dépasse 1 m pour un pas d'une heure, mis à l'échelle du pas.
+    """
+
+    params = [600, 3600]
+    param_names = ['step']
+
+    def setup(self, step):
+        rng = np.random.default_rng(1)
+        # Table de trois jours débutant à une date aléatoire de 2023
+        self.t0 = (pd.Timestamp('2023-01-01')
+                   + pd.to_timedelta(rng.uniform(0, 365 * 86400), unit='s'))
+        self.rotation = coordinates.EarthRotation(self.t0, 3 * 86400, step)
+        self.t = rng.uniform(0, 3 * 86400, 500)
+        # Positions orbitales aléatoires, à 6800 km du centre de la Terre
+        xyz = rng.normal(size=(3, 500))
+        self.xyz = xyz * 6800 / np.linalg.norm(xyz, axis=0)
+        self.exact = coordinates.rotate_vectors(
+            coordinates.celestial2terrestrial_matrices(
+                self.t0 + pd.to_timedelta(self.t, unit='s')), self.xyz)
+        self.tolerance = 1.0 * (step / 3600)**2  # m
+
+    def __check(self, table):
+        """Ecart maximal (m) à la rotation exacte, borné par la
+        tolérance."""
+        error = np.linalg.norm(table - self.exact, axis=0).max() * 1e3
+        if not error < self.tolerance:
+            raise AssertionError(f"rotation table error of {error:.3g} m "
+                                 f"exceeds {self.tolerance:.3g} m.")
+        return error
+
+    def track_matrix_error(self, step):
+        return self.__check(coordinates.rotate_vectors(
+            self.rotation.matrix(self.t), self.xyz))
+    track_matrix_error.unit = "m"
+
+    def track_scalar_matrix_error(self, step):
+        return self.__check(np.array(
+            [self.rotation.matrix(t) @ r
+             for t, r in zip(self.t, self.xyz.T)]).T)
+    track_scalar_matrix_error.unit = "m"
+
+
+class WorldmapTraces:
+    """Découpage de longues traces au sol en traces planisphère."""
+
+    params = [10_000, 1_000_000]
+    param_names = ['size']
+
+    def setup(self, size):
+        # Trace au sol d'une orbite inclinée à 51.6°, 16 révolutions par
+        # jour, échantillonnée toutes les 10 s
+        t = np.arange(size) * 10.0
+        phase = 2 * np.pi * t / 5400
+        lat = np.degrees(np.arcsin(np.sin(np.radians(51.6))
+                                   * np.sin(phase)))
+        lon = np.degrees(np.arctan2(np.cos(np.radians(51.6))
+                                    * np.sin(phase), np.cos(phase)))
+        self.lon = (lon - 360 * t / 86164 + 180) % 360 - 180
+        self.lat = lat
+
+    def time_worldmap_traces(self, size):
+        coordinates.worldmap_traces(self.lon, self.lat)
+
+    def time_worldmap_traces_split(self, size):
+        coordinates.worldmap_traces(self.lon, self.lat, join_traces=False)
+
+    def time_worldmap_path(self, size):
+        coordinates.worldmap_path(self.lon, self.lat)
+
+    def time_decimate(self, size):
+        from isslib.visualization import decimate
+        decimate(np.array([np.unwrap(self.lon, period=360), self.lat]), 0.05)
+
+    def track_decimated_points(self, size):
+        from isslib.visualization import decimate
+        return len(decimate(np.array([np.unwrap(self.lon, period=360),
+                                      self.lat]), 0.05))
+    track_decimated_points.unit = "points"
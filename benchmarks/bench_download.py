@@ -0,0 +1,142 @@
+"""Téléchargement des fichiers sources depuis un serveur HTTP local."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import zlib
+
+import pandas as pd
+
+from benchmarks import DATA_FILE
+
+# Chemin des fichiers archivés sur le serveur local, par date
+ARCHIVE_PATH = "/{date:%Y-%m-%d}/ISS_OEM/ISS.OEM_J2K_EPH.txt"
+
+# Dates servies : fichier source, page HTML et fichier absent
+OEM_DATE, HTML_DATE, MISSING_DATE = pd.date_range('2023-04-20', periods=3)
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Serveur d'archive minimal, répondant aux requêtes conditionnelles.
+
+    Les contenus servis (`server.files`, par chemin) ont pour `ETag` leur
+    somme de contrôle ; le statut de chaque réponse est ajouté à la liste
+    `server.statuses`.
+    """
+
+    def do_GET(self):
+        content = self.server.files.get(self.path)
+        if content is None:
+            self.server.statuses.append(404)
+            self.send_error(404)
+            return
+        etag = f'"{zlib.crc32(content):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.server.statuses.append(304)
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.server.statuses.append(200)
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        """Journal des requêtes désactivé."""
+
+
+class DownloadCheck:
+    """Contrôle du téléchargeur face à un serveur HTTP local.
+
+    Les fichiers archivés de trois dates sont téléchargés simultanément : le
+    fichier de référence, une page HTML à rejeter (signature OEM absente) et
+    un fichier absent du serveur (404). Les mesures échouent si les erreurs
+    rapportées, les permissions du fichier téléchargé ou la revalidation
+    conditionnelle (304) ne sont pas celles attendues.
+    """
+
+    def setup(self):
+        # Import différé : requests n'est nécessaire qu'au téléchargement
+        from isslib.download import Downloader
+        with open(DATA_FILE, 'rb') as file:
+            self.content = file.read()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ArchiveHandler)
+        self.server.files = {
+            ARCHIVE_PATH.format(date=OEM_DATE): self.content,
+            ARCHIVE_PATH.format(date=HTML_DATE): b"<html>Not found</html>",
+        }
+        self.server.statuses = []
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.directory = tempfile.mkdtemp()
+        host, port = self.server.server_address
+        self.downloader = Downloader(
+            self.directory, f"http://{host}:{port}{ARCHIVE_PATH}", retries=0)
+        self.errors = self.downloader.fetch_range(OEM_DATE, MISSING_DATE)
+        self.filename = self.downloader.filename(OEM_DATE)
+
+    def teardown(self):
+        self.downloader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def track_fetch_range(self):
+        import requests
+        errors = self.errors
+        html, missing = (self.downloader.filename(date)
+                         for date in (HTML_DATE, MISSING_DATE))
+        if self.filename not in errors or errors[self.filename] is not None:
+            raise AssertionError(
+                f"download failed: {errors.get(self.filename)}")
+        if not isinstance(errors.get(html), ValueError):
+            raise AssertionError(f"HTML page not rejected: {errors.get(html)}")
+        error = errors.get(missing)
+        if not (isinstance(error, requests.HTTPError)
+                and error.response.status_code == 404):
+            raise AssertionError(f"missing file not reported: {error}")
+        # Seul le fichier valide est écrit, sans fichier temporaire résiduel
+        written = sorted(name for name in os.listdir(self.directory)
+                         if not name.startswith('.'))
+        expected = sorted(os.path.basename(name) for name in
+                          (self.filename, f"{self.filename}.http.json"))
+        if written != expected:
+            raise AssertionError(f"unexpected files {written}.")
+        with open(self.filename, 'rb') as file:
+            if file.read() != self.content:
+                raise AssertionError("downloaded file differs from source.")
+        return sum(error is None for error in errors.values())
+    track_fetch_range.unit = "files"
+
+    def track_file_mode(self):
+        # Permissions d'un fichier créé normalement dans le même répertoire
+        reference = os.path.join(self.directory, "reference")
+        open(reference, 'w').close()
+        expected = stat.S_IMODE(os.stat(reference).st_mode)
+        os.remove(reference)
+        for name in (self.filename, f"{self.filename}.http.json"):
+            mode = stat.S_IMODE(os.stat(name).st_mode)
+            if mode != expected:
+                raise AssertionError(f"{os.path.basename(name)} has mode "
+                                     f"{mode:o} instead of {expected:o}.")
+        return expected
+    track_file_mode.unit = "mode"
+
+    def track_conditional_request(self):
+        mtime = os.stat(self.filename).st_mtime_ns
+        changed = self.downloader.fetch(
+            self.downloader.archive_url.format(date=OEM_DATE), self.filename,
+            force=True)
+        status = self.server.statuses[-1]
+        if changed or status != 304:
+            raise AssertionError(f"revalidation answered {status}, "
+                                 f"changed={changed}.")
+        if os.stat(self.filename).st_mtime_ns != mtime:
+            raise AssertionError("unchanged file was rewritten.")
+        return status
+    track_conditional_request.unit = "status"
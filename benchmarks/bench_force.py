@@ -0,0 +1,114 @@
+"""Evaluations de la dérivée, par force et pour le jeu de forces complet."""
+import time
+
+import numpy as np
+
+from benchmarks import DATA_FILE
+from isslib.atmosphere import harris_priester
+from isslib.coordinates import EarthRotation
+from isslib.ensemble import COLUMNS, standard_forceset
+from isslib.force import (AtmosphericDrag, BodyInfluence, CelestialBody,
+                          EarthGravity, ForceSet, Geopotential, numba)
+from isslib.gravity import HarmonicGeopotential
+from isslib.position import ISS_Position
+
+# Forces mesurées isolément, et jeu de forces de référence complet
+FORCES = ['EarthGravity', 'Geopotential', 'HarmonicGeopotential',
+          'AtmosphericDrag', 'HarrisPriesterDrag', 'BodyInfluence',
+          'ForceSet']
+
+# Modes d'évaluation : dérivée de référence puis dérivées compilées
+MODES = ['derivee', 'numpy'] + (['numba'] if numba is not None else [])
+
+
+def harmonic_field(degree=20):
+    """Champ de coefficients normalisés synthétique et reproductible."""
+    rng = np.random.default_rng(0)
+    n = np.arange(degree + 1)[:, np.newaxis]
+    C, S = (np.tril(rng.normal(size=(degree + 1, degree + 1)))
+            * 1e-6 / np.maximum(n, 1)**2 for _ in range(2))
+    C[0, 0], C[1], S[1] = 1, 0, 0
+    C[2, 0] = -484.165e-6
+    return C, S
+
+
+def build_forceset(name, iss, t0):
+    """Jeu de forces réduit à la force `name`, ou jeu de référence."""
+    if name == 'ForceSet':
+        return standard_forceset(iss, t0, 86400)
+    rotation = EarthRotation(t0, 86400)
+    if name == 'EarthGravity':
+        force = EarthGravity()
+    elif name == 'Geopotential':
+        force = Geopotential(t0, rotation)
+    elif name == 'HarmonicGeopotential':
+        force = HarmonicGeopotential(t0, rotation, field=harmonic_field())
+    elif name == 'AtmosphericDrag':
+        force = AtmosphericDrag(iss.get_metadata("MASS"),
+                                iss.get_metadata("DRAG_COEFF"),
+                                iss.get_metadata("DRAG_AREA"))
+    else:
+        from astropy.coordinates import get_sun
+        sun = CelestialBody('Soleil', 1.988e30, get_sun, t0)
+        sun.cache(0, 86400)
+        if name == 'HarrisPriesterDrag':
+            # Masse volumique tabulée avec renflement diurne
+            force = AtmosphericDrag(iss.get_metadata("MASS"),
+                                    iss.get_metadata("DRAG_COEFF"),
+                                    iss.get_metadata("DRAG_AREA"),
+                                    harris_priester(), sun)
+        else:
+            force = BodyInfluence(sun)
+    return ForceSet([force])
+
+
+class Derivative:
+    """Débit d'évaluation de la dérivée, simple et groupée."""
+
+    params = [FORCES, MODES, [1, 50]]
+    param_names = ['force', 'mode', 'trajectories']
+
+    def setup(self, name, mode, trajectories):
+        iss = ISS_Position(DATA_FILE)
+        data = iss.get_data()
+        t0 = data['datetime'].iloc[0]
+        u = data[COLUMNS].to_numpy()[0]
+        # Trajectoires groupées proches de la première position
+        if trajectories > 1:
+            rng = np.random.default_rng(0)
+            u = u[:, np.newaxis] + rng.normal(size=(6, trajectories)) * 1e-2
+        forceset = build_forceset(name, iss, t0)
+        if mode == 'derivee':
+            self.evaluate = lambda t: forceset.derivee(u, t)
+        else:
+            derivative = forceset.compile(u.shape, mode)
+            out = np.empty(u.shape)
+            self.evaluate = lambda t: derivative(u, t, out)
+        self.times = np.linspace(0, 86000, 1000)
+        self.evaluate(0.0)
+
+    def time_1000_evaluations(self, name, mode, trajectories):
+        for t in self.times:
+            self.evaluate(t)
+
+    def track_evaluations_per_second(self, name, mode, trajectories):
+        start = time.perf_counter()
+        for t in self.times:
+            self.evaluate(t)
+        return len(self.times) / (time.perf_counter() - start)
+    track_evaluations_per_second.unit = "evaluations/s"
+
+
+class ForceMagnitude:
+    """Ordres de grandeur des forces du jeu de référence (contrôle)."""
+
+    def setup(self):
+        iss = ISS_Position(DATA_FILE)
+        data = iss.get_data()
+        self.u = data[COLUMNS].to_numpy()[0]
+        self.forceset = build_forceset('ForceSet', iss,
+                                       data['datetime'].iloc[0])
+
+    def track_total_acceleration(self):
+        return np.linalg.norm(self.forceset.derivee(self.u, 0.0)[3:])
+    track_total_acceleration.unit = "km/s²"
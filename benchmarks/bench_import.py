@@ -0,0 +1,57 @@
+"""Temps d'import à froid de la bibliothèque et dépendances chargées."""
+import json
+import subprocess
+import sys
+
+from benchmarks import ROOT
+
+# Dépendances lourdes qu'un import du jeu de forces ne doit pas charger
+HEAVY = ['matplotlib', 'plotly', 'requests', 'pandas', 'astropy',
+         'astropy.coordinates', 'scipy.integrate']
+
+
+def loaded_modules(statement):
+    """Dépendances lourdes chargées par `statement` dans un nouveau
+    processus."""
+    code = (f"import sys; sys.path.insert(0, {ROOT!r}); {statement}; "
+            f"import json; print(json.dumps([m for m in {HEAVY!r} "
+            f"if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def check_light(statement):
+    """Nombre de dépendances lourdes chargées par `statement`, nul sous
+    peine d'échec de la mesure."""
+    loaded = loaded_modules(statement)
+    if loaded:
+        raise AssertionError(f"{statement!r} loads {', '.join(loaded)}.")
+    return len(loaded)
+
+
+class Import:
+    """Imports à froid, chacun mesuré dans un nouveau processus."""
+
+    # Les mesures `timeraw_*` lancent un interpréteur par répétition
+    number = 1
+    repeat = 5
+
+    def timeraw_import_isslib(self):
+        return f"import sys; sys.path.insert(0, {ROOT!r})", "import isslib"
+
+    def timeraw_import_forceset(self):
+        return (f"import sys; sys.path.insert(0, {ROOT!r})",
+                "from isslib import ForceSet")
+
+    def timeraw_import_iss_position(self):
+        return (f"import sys; sys.path.insert(0, {ROOT!r})",
+                "from isslib import ISS_Position")
+
+    def track_heavy_modules_isslib(self):
+        return check_light("import isslib")
+    track_heavy_modules_isslib.unit = "modules"
+
+    def track_heavy_modules_forceset(self):
+        return check_light("from isslib import ForceSet")
+    track_heavy_modules_forceset.unit = "modules"
@@ -0,0 +1,110 @@
+"""Lecture des fichiers sources et interpolation des états de l'ISS."""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from benchmarks import DATA_FILE
+from isslib.position import ISS_Position
+
+
+def write_month(filename, days=30):
+    """Fichier source synthétique d'au moins `days` jours.
+
+    L'en-tête du fichier de référence est suivi de son bloc de données
+    répété bout à bout, chaque copie étant décalée de la durée du bloc.
+    """
+    with open(DATA_FILE) as file:
+        lines = file.readlines()
+    first = next(i for i, line in enumerate(lines) if line[:1].isdigit())
+    header = lines[:first]
+    records = [line.rstrip('\n') + '\n' for line in lines[first:]]
+    start = np.datetime64(records[0][:23])
+    span = np.datetime64(records[-1][:23]) - start
+    copies = int(np.ceil(np.timedelta64(days, 'D') / span))
+    with open(filename, 'w') as file:
+        file.writelines(header + records)
+        for copy in range(1, copies):
+            # Le premier enregistrement de la copie est celui qui clôt la
+            # copie précédente
+            for line in records[1:]:
+                date = np.datetime64(line[:23]) + copy * span
+                file.write(np.datetime_as_string(date, unit='ms') + line[23:])
+
+
+class ParseOEM:
+    """Lecture d'un fichier source, sans et avec cache binaire.
+
+    Le fichier est soit le fichier de référence (environ 6000 lignes), soit
+    un fichier synthétique d'un mois concaténant son bloc de données.
+    """
+
+    params = ['bundled', 'month']
+    param_names = ['source']
+
+    def setup(self, source):
+        # Copie ou création du fichier dans un répertoire temporaire, pour
+        # maîtriser l'état de son cache
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory,
+                                     os.path.basename(DATA_FILE))
+        if source == 'month':
+            write_month(self.filename)
+        else:
+            shutil.copy(DATA_FILE, self.filename)
+        ISS_Position(self.filename)
+
+    def teardown(self, source):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def time_parse(self, source):
+        ISS_Position(self.filename, cache=False)
+
+    def time_load_cached(self, source):
+        ISS_Position(self.filename)
+
+    def track_records(self, source):
+        return len(ISS_Position(self.filename).get_data())
+    track_records.unit = "records"
+
+
+class StateInterpolation:
+    """Interpolation des états aux dates quelconques."""
+
+    params = ['hermite', 'lagrange']
+    param_names = ['method']
+
+    def setup(self, method):
+        self.iss = ISS_Position(DATA_FILE)
+        data = self.iss.get_data()
+        epochs = data['datetime'].to_numpy()
+        # Dates aléatoires reproductibles dans la période des données
+        rng = np.random.default_rng(0)
+        span = (epochs[-1] - epochs[0]).astype(np.int64)
+        self.queries = epochs[0] + rng.integers(0, span, 100_000).astype(
+            'timedelta64[ns]')
+        self.iss.interpolator(method)
+
+    def time_build(self, method):
+        ISS_Position(DATA_FILE).interpolator(method)
+
+    def time_state_at_100k(self, method):
+        self.iss.state_at(self.queries, method)
+
+    def track_leave_one_out_error(self, method):
+        # Ecart maximal (m) aux enregistrements omis, un sur deux, dans
+        # les épisodes sans poussée
+        from isslib.interpolation import StateInterpolator
+        data = self.iss.get_data()
+        epochs = data['datetime'].to_numpy()
+        states = data[['x', 'y', 'z', 'vx', 'vy', 'vz']].to_numpy()
+        episodes = data['thrust_episode'].to_numpy()
+        interpolator = StateInterpolator(epochs[::2], states[::2],
+                                         episodes[::2], method)
+        odd = np.arange(1, len(epochs) - 1, 2)
+        odd = odd[(episodes[odd - 1] == episodes[odd + 1])
+                  & ~data['on_thrust'].to_numpy()[odd]]
+        error = interpolator(epochs[odd])[:3] - states[odd, :3].T
+        return np.linalg.norm(error, axis=0).max() * 1e3
+    track_leave_one_out_error.unit = "m"
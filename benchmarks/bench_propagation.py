@@ -0,0 +1,131 @@
+"""Propagation de bout en bout d'un arc de mouvement libre."""
+import numpy as np
+import pandas as pd
+
+from benchmarks import DATA_FILE
+from isslib.analytic import J2Propagator
+from isslib.ensemble import COLUMNS, free_flight_episodes, standard_forceset
+from isslib.fitting import fit_arc
+from isslib.position import ISS_Position
+
+# Arc de 1000 pas de 10 secondes
+STEPS, STEP = 1000, 10.0
+
+
+class FreeFlightArc:
+    """Propagation et résidus aux données d'un arc de mouvement libre."""
+
+    # Les propagations durent plusieurs secondes
+    timeout = 600
+    number = 1
+    repeat = 3
+
+    def setup(self):
+        self.iss = ISS_Position(DATA_FILE)
+        data = self.iss.get_data()
+        # Premier épisode sans poussée couvrant l'arc
+        duration = STEPS * STEP
+        for _, arc in data.query('~on_thrust').groupby('thrust_episode'):
+            span = arc['datetime'].iloc[-1] - arc['datetime'].iloc[0]
+            if span.total_seconds() >= duration:
+                break
+        else:
+            raise NotImplementedError("no free-flight arc long enough.")
+        self.t0 = arc['datetime'].iloc[0]
+        self.u0 = arc[COLUMNS].to_numpy()[0]
+        self.forceset = standard_forceset(self.iss, self.t0, duration)
+        self.analytic = J2Propagator.from_position(self.iss, self.t0)
+        self.t_eval = np.arange(STEPS + 1) * STEP
+        # Trajectoires groupées proches de la position initiale
+        rng = np.random.default_rng(0)
+        self.batch = (self.u0[:, np.newaxis]
+                      + rng.normal(size=(6, 50)) * 1e-2)
+
+    def __residuals(self, t, v):
+        """Résidus de position (km) aux états interpolés des données."""
+        epochs = self.t0 + pd.to_timedelta(t, unit='s')
+        return np.linalg.norm(v[:3] - self.iss.state_at(epochs)[:3], axis=0)
+
+    def time_rk4(self):
+        self.forceset.solve(0, STEPS * STEP, STEP, self.u0)
+
+    def time_rk4_batch_50(self):
+        self.forceset.solve(0, STEPS * STEP, STEP, self.batch)
+
+    def time_abm8(self):
+        self.forceset.solve(0, STEPS * STEP, STEP, self.u0, method='ABM8')
+
+    def time_dop853(self):
+        self.forceset.solve_adaptive(self.t_eval, self.u0)
+
+    def time_analytic(self):
+        self.analytic.solve(0, STEPS * STEP, STEP)
+
+    def time_analytic_1e6(self):
+        self.analytic.solve(0, 1e6 - 1, 1.0)
+
+    def time_variational_drag(self):
+        self.forceset.solve_variational(self.t_eval, self.u0, ['drag_coeff'])
+
+    def track_rk4_residual_max(self):
+        return self.__residuals(
+            *self.forceset.solve(0, STEPS * STEP, STEP, self.u0)).max()
+    track_rk4_residual_max.unit = "km"
+
+    def track_abm8_residual_max(self):
+        return self.__residuals(*self.forceset.solve(
+            0, STEPS * STEP, STEP, self.u0, method='ABM8')).max()
+    track_abm8_residual_max.unit = "km"
+
+    def track_dop853_residual_max(self):
+        return self.__residuals(
+            *self.forceset.solve_adaptive(self.t_eval, self.u0)).max()
+    track_dop853_residual_max.unit = "km"
+
+    def track_analytic_residual_max(self):
+        return self.__residuals(
+            *self.analytic.solve(0, STEPS * STEP, STEP)).max()
+    track_analytic_residual_max.unit = "km"
+
+    def track_dop853_evaluations(self):
+        self.forceset.solve_adaptive(self.t_eval, self.u0)
+        return self.forceset.stats['nfev']
+    track_dop853_evaluations.unit = "evaluations"
+
+
+class FitArcCheck:
+    """Contrôle de l'ajustement du coefficient de traînée sur un jour.
+
+    Le premier épisode de mouvement libre est ajusté sur un jour avec le jeu
+    de forces de référence : la mesure échoue si le coefficient de traînée
+    ajusté sort de l'intervalle physique `DRAG_COEFFS`, ou si les résidus
+    dépassent 1 km.
+    """
+
+    timeout = 600
+    number = 1
+    repeat = 1
+
+    # Intervalle des coefficients de traînée physiquement plausibles
+    DRAG_COEFFS = (1.5, 4.0)
+
+    def setup(self):
+        iss = ISS_Position(DATA_FILE)
+        self.fit = fit_arc(iss, free_flight_episodes(iss)[0],
+                           max_duration=86400)
+
+    def track_drag_coeff(self):
+        drag_coeff = self.fit['parameters']['drag_coeff']
+        low, high = self.DRAG_COEFFS
+        if not low <= drag_coeff <= high:
+            raise AssertionError(f"fitted drag coefficient {drag_coeff:.3g} "
+                                 f"is outside [{low:g}, {high:g}].")
+        return drag_coeff
+    track_drag_coeff.unit = "coefficient"
+
+    def track_rms(self):
+        if not self.fit['rms'] < 1:
+            raise AssertionError(f"fit rms of {self.fit['rms']:.3g} km "
+                                 "exceeds 1 km.")
+        return self.fit['rms']
+    track_rms.unit = "km"
@@ -17,8 +17,42 @@ visualization
 
 Par commodité, les classes `Force`, `ForceSet` et `ISS_Position` sont chargées
 dans le package principal, en tant qu'éléments centraux de la bibliothèque.
+
+Les sous-packages et ces classes ne sont importés qu'à leur premier accès
+(`isslib.visualization`, `from isslib import ForceSet`, ...) : un processus
+n'utilisant que le jeu de forces ne charge ni matplotlib, ni plotly, ni
+requests. Les représentations graphiques (`visualization`) et le
+téléchargement des fichiers sources (`download`) sont optionnels.
 """
-import isslib.coordinates as coordinates  # noqa: F401
-import isslib.visualization as visualization  # noqa: F401
-from isslib.position import ISS_Position  # noqa: F401
-from isslib.force import Force, ForceSet  # noqa: F401
+import importlib
+
+# Sous-packages chargés au premier accès
+_SUBMODULES = {'analytic', 'archive', 'atmosphere', 'coordinates',
+               'download', 'ensemble', 'ephemeris', 'fitting', 'force',
+               'gravity', 'interpolation', 'position', 'profiling', 'store',
+               'visualization'}
+
+# Eléments centraux de la bibliothèque et sous-package les définissant
+_EXPORTS = {'ISS_Position': 'position', 'Force': 'force', 'ForceSet': 'force'}
+
+# Les sous-packages optionnels (`visualization`, `download`) sont exclus de
+# `from isslib import *`, utilisable sans les dépendances graphiques
+__all__ = ['coordinates', 'ISS_Position', 'Force', 'ForceSet']
+
+
+def __getattr__(name):
+    """Import différé des sous-packages et des éléments centraux."""
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    if name in _EXPORTS:
+        module = importlib.import_module(f"{__name__}.{_EXPORTS[name]}")
+        value = getattr(module, name)
+        # Mise en cache dans le package, les accès suivants étant directs
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    """Liste des attributs, y compris ceux chargés au premier accès."""
+    return sorted(set(globals()) | _SUBMODULES | set(_EXPORTS))
@@ -0,0 +1,228 @@
+"""
+isslib.analytic
+===============
+
+Fournit la propagation analytique rapide des orbites par éléments moyens :
+variations séculaires dues au terme J2 du géopotentiel et décroissance
+optionnelle du demi-grand axe par la traînée atmosphérique.
+"""
+import numpy as np
+import pandas as pd
+
+# Constantes du modèle numérique (`isslib.gravity.HarmonicGeopotential`) :
+# paramètre gravitationnel G*M de la Terre, rayon de référence du
+# géopotentiel et J2 = -sqrt(5)*C20
+MU = 6.67430e-20 * 5.972e24  # km^3.s^-2
+RADIUS = 6378.1363  # km
+J2 = np.sqrt(5) * 484.2e-6
+
+# Masse volumique de l'air de `isslib.force.AtmosphericDrag`
+RHO = 1e-12  # kg.m^-3
+
+# Vitesse angulaire moyenne de la Terre
+OMEGA = 7.292e-5  # rad.s^-1
+
+
+def cartesian2elements(coords, mu=MU):
+    """Eléments orbitaux osculateurs de coordonnées cartésiennes.
+
+    `coords` est un vecteur `[x, y, z, vx, vy, vz]` ou un tableau `(6, N)`.
+    Retourne le tableau `[a, e, i, raan, argp, M]` (ou `(6, N)`) du demi-grand
+    axe (km), de l'excentricité, de l'inclinaison, de la longitude du noeud
+    ascendant, de l'argument du périgée et de l'anomalie moyenne (rad).
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    r, v = coords[:3], coords[3:]
+    n_r = np.sqrt(np.sum(r * r, axis=0))
+    v2 = np.sum(v * v, axis=0)
+    rv = np.sum(r * v, axis=0)
+    # Moment cinétique, direction du noeud ascendant et vecteur excentricité
+    h = np.cross(r, v, axis=0)
+    n_h = np.sqrt(np.sum(h * h, axis=0))
+    node = np.array([-h[1], h[0], np.zeros_like(h[0])])
+    node /= np.sqrt(np.sum(node * node, axis=0))
+    ecc = ((v2 - mu / n_r) * r - rv * v) / mu
+    # Direction du plan orbital orthogonale au noeud ascendant
+    normal = np.cross(h / n_h, node, axis=0)
+    a = 1 / (2 / n_r - v2 / mu)
+    e = np.sqrt(np.sum(ecc * ecc, axis=0))
+    i = np.arccos(h[2] / n_h)
+    raan = np.arctan2(h[0], -h[1])
+    # Argument de latitude, du périgée et anomalie vraie
+    u = np.arctan2(np.sum(r * normal, axis=0), np.sum(r * node, axis=0))
+    argp = np.where(e > 1e-12, np.arctan2(np.sum(ecc * normal, axis=0),
+                                          np.sum(ecc * node, axis=0)), 0)
+    nu = u - argp
+    # Anomalies excentrique puis moyenne
+    E = np.arctan2(np.sqrt(1 - e**2) * np.sin(nu), e + np.cos(nu))
+    return np.array([a, e, i, raan, argp, E - e * np.sin(E)])
+
+
+def elements2cartesian(elements, mu=MU):
+    """Coordonnées cartésiennes d'éléments orbitaux.
+
+    Transformation inverse de `cartesian2elements`, vectorisée sur les
+    éléments `(6, N)`. L'équation de Kepler est résolue par la méthode de
+    Newton, simultanément pour tous les éléments.
+    """
+    a, e, i, raan, argp, M = np.asarray(elements, dtype=np.float64)
+    # Equation de Kepler E - e*sin(E) = M
+    E = np.array(M, dtype=np.float64)
+    for _ in range(20):
+        step = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E -= step
+        if np.all(np.abs(step) < 1e-13):
+            break
+    # Anomalie vraie, rayon et argument de latitude
+    eta = np.sqrt(1 - e**2)
+    nu = np.arctan2(eta * np.sin(E), np.cos(E) - e)
+    r = a * (1 - e * np.cos(E))
+    u = argp + nu
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    cos_o, sin_o = np.cos(raan), np.sin(raan)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    # Vecteurs unitaires radial et transverse
+    radial = np.array([cos_o * cos_u - sin_o * sin_u * cos_i,
+                       sin_o * cos_u + cos_o * sin_u * cos_i,
+                       sin_u * sin_i])
+    transverse = np.array([-cos_o * sin_u - sin_o * cos_u * cos_i,
+                           -sin_o * sin_u + cos_o * cos_u * cos_i,
+                           cos_u * sin_i])
+    # Vitesses radiale et transverse
+    k = np.sqrt(mu / (a * eta**2))
+    return np.concatenate([r * radial,
+                           k * e * np.sin(nu) * radial
+                           + k * (1 + e * np.cos(nu)) * transverse])
+
+
+class J2Propagator:
+    """Propagation analytique d'une orbite par éléments moyens.
+
+    Les éléments osculateurs de l'état initial sont convertis en éléments
+    moyens au premier ordre de J2 (correction périodique du demi-grand axe de
+    Brouwer), puis propagés en forme close : variations séculaires de la
+    longitude du noeud, de l'argument du périgée et de l'anomalie moyenne
+    dues à J2, et, si un coefficient balistique est fourni, décroissance du
+    demi-grand axe par la traînée d'une orbite quasi circulaire,
+    `da/dt = -rho B F sqrt(mu a)`, où `F` corrige de la rotation de
+    l'atmosphère. Les états sont évalués simultanément pour un tableau de
+    temps quelconques, à raison d'environ un million par seconde.
+
+    Les termes périodiques de courte période (hors demi-grand axe), les
+    harmoniques C22/S22, les corps tiers et la précession de l'axe terrestre
+    depuis J2000 sont négligés. Sur les épisodes de mouvement libre des
+    fichiers sources, l'écart aux positions publiées est de l'ordre de
+    10 km sur une orbite, 30 à 75 km sur un jour et 120 à 290 km sur trois
+    jours, essentiellement le long de la trajectoire, comparable à celui du
+    jeu de forces de référence (`isslib.ensemble.standard_forceset`, 25 à
+    45 km sur un jour) pour un coût bien moindre. Le propagateur convient au
+    repérage (passages, couverture au sol, scénarios de manoeuvre), pas à la
+    restitution précise de l'orbite.
+    """
+
+    def __init__(self, coords, epoch=None, ballistic=None, rho=RHO, mu=MU,
+                 j2=J2, radius=RADIUS):
+        """Calcule les éléments moyens et leurs dérivées séculaires.
+
+        Paramètres:
+        - coords: coordonnées cartésiennes `[x, y, z, vx, vy, vz]` initiales
+                  (km et km/s, repère céleste).
+        - epoch: date correspondant au temps `t=0`, nécessaire à `state_at`.
+        - ballistic: coefficient balistique `C_D A / m` en m²/kg (par défaut,
+                     sans traînée).
+        - rho: masse volumique de l'air en kg/m³.
+        - mu, j2, radius: paramètre gravitationnel (km³/s²), coefficient J2
+                          et rayon de référence (km) du géopotentiel.
+        """
+        self.epoch = None if epoch is None else pd.Timestamp(epoch)
+        self.mu = mu
+        a, e, i, raan, argp, M = cartesian2elements(coords, mu)
+        # Correction de courte période du demi-grand axe (Brouwer, 1959),
+        # fonction de l'argument de latitude u = argp + nu
+        x, y, z = np.asarray(coords[:3], dtype=np.float64)
+        r = np.sqrt(x*x + y*y + z*z)
+        u = np.arctan2(z / np.sin(i), x * np.cos(raan) + y * np.sin(raan))
+        eta = np.sqrt(1 - e**2)
+        gamma = j2 / 2 * (radius / a)**2
+        theta = np.cos(i)
+        a /= 1 + gamma * ((3 * theta**2 - 1) * ((a / r)**3 - eta**-3)
+                          + 3 * (1 - theta**2) * (a / r)**3 * np.cos(2 * u))
+        self.elements = np.array([a, e, i, raan, argp, M])
+        # Dérivées séculaires, relatives au mouvement moyen
+        p2 = (radius / (a * (1 - e**2)))**2
+        self.raan_rate = -1.5 * j2 * p2 * theta
+        self.argp_rate = 0.75 * j2 * p2 * (5 * theta**2 - 1)
+        self.mean_rate = 1 + 0.75 * j2 * p2 * eta * (3 * theta**2 - 1)
+        # Taux de décroissance de sqrt(a), en km^0.5.s^-1 (le facteur 1e3
+        # convertit rho*B de m^-1 en km^-1)
+        self.decay = 0.0
+        if ballistic:
+            wind = (1 - OMEGA * a * theta / np.sqrt(mu / a))**2
+            self.decay = 0.5 * rho * ballistic * 1e3 * wind * np.sqrt(mu)
+
+    @classmethod
+    def from_position(cls, iss, epoch=None, drag=True, **kwargs):
+        """Propagateur initialisé à l'état de l'ISS à la date `epoch`.
+
+        L'état est interpolé depuis les données `iss` (par défaut, au premier
+        enregistrement) et le coefficient balistique est calculé à partir
+        des métadonnées `DRAG_COEFF`, `DRAG_AREA` et `MASS` si `drag` est
+        vrai.
+        """
+        if epoch is None:
+            epoch = iss.get_data()['datetime'].iloc[0]
+        coords = iss.state_at(epoch)[:, 0]
+        if drag:
+            kwargs.setdefault('ballistic', iss.get_metadata("DRAG_COEFF")
+                              * iss.get_metadata("DRAG_AREA")
+                              / iss.get_metadata("MASS"))
+        return cls(coords, epoch, **kwargs)
+
+    def mean_elements(self, t):
+        """Eléments moyens `(6, N)` aux temps `t` (secondes depuis `t=0`)."""
+        t = np.asarray(t, dtype=np.float64)
+        a0, e, i, raan, argp, M0 = self.elements
+        n0 = np.sqrt(self.mu / a0**3)
+        if self.decay:
+            # sqrt(a) décroît linéairement ; l'anomalie moyenne est
+            # l'intégrale du mouvement moyen sqrt(mu)/sqrt(a)³
+            s0 = np.sqrt(a0)
+            s = s0 - self.decay * t
+            a = s * s
+            angle = (np.sqrt(self.mu) / (2 * self.decay)
+                     * (1 / (s * s) - 1 / (s0 * s0)))
+        else:
+            a = np.full(t.shape, a0)
+            angle = n0 * t
+        full = np.full(t.shape, 1.0)
+        return np.array([a, e * full, i * full, raan + self.raan_rate * angle,
+                         argp + self.argp_rate * angle,
+                         M0 + self.mean_rate * angle])
+
+    def propagate(self, t):
+        """Etats cartésiens `(6, N)` aux temps `t` (secondes depuis `t=0`)."""
+        return elements2cartesian(self.mean_elements(t), self.mu)
+
+    def solve(self, t_start, t_stop, t_step):
+        """Etats sur la grille temporelle de `ForceSet.solve`.
+
+        Retourne les tableaux des temps et des états `(6, num_points)`.
+        """
+        num_points = int((t_stop - t_start) / t_step) + 1
+        t = np.linspace(t_start, t_stop, num_points)
+        return t, self.propagate(t)
+
+    def state_at(self, epochs):
+        """Etats `(6, N)` aux dates `epochs`."""
+        if self.epoch is None:
+            raise ValueError("an epoch is required to propagate to dates.")
+        epochs = np.atleast_1d(np.asarray(pd.to_datetime(epochs),
+                                          dtype='datetime64[ns]'))
+        return self.propagate((epochs - np.datetime64(self.epoch, 'ns'))
+                              / np.timedelta64(1, 's'))
+
+    def __repr__(self):
+        """Représentation du propagateur sous forme de string."""
+        a, e, i = self.elements[:3]
+        return (f"J2Propagator[a={a:.3f} km, e={e:.2e}, "
+                f"i={np.degrees(i):.3f}°]")
@@ -0,0 +1,193 @@
+"""
+isslib.archive
+==============
+
+Fournit l'archive des positions de l'ISS fusionnant un répertoire de
+fichiers sources dont les périodes se recouvrent.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from isslib.interpolation import StateInterpolator
+from isslib.position import ISS_Position
+
+
+class ISS_Archive:
+    """Archive des positions de l'ISS issues de plusieurs fichiers sources.
+
+    Les téléchargements quotidiens couvrent chacun une quinzaine de jours et
+    se recouvrent largement : sur la période couverte par un fichier, ses
+    positions remplacent celles des fichiers de date de création antérieure.
+    Le résultat est un unique jeu de tableaux triés par date, enregistré sur
+    disque et relu en mémoire partagée (`numpy.memmap`), ce qui permet des
+    recherches par dichotomie sans conserver les DataFrames des fichiers.
+    """
+
+    # Motif des noms de fichiers sources
+    pattern = "ISS.OEM_J2K_EPH_*.txt"
+
+    # Colonnes des coordonnées cartésiennes
+    columns = ['x', 'y', 'z', 'vx', 'vy', 'vz']
+
+    def __init__(self, directory="data", store=None, max_gap=240):
+        """Charge l'archive d'un répertoire, en la reconstruisant au besoin.
+
+        Paramètres:
+        - directory: répertoire des fichiers sources.
+        - store: répertoire d'enregistrement des tableaux de l'archive (par
+                 défaut, le sous-répertoire `archive` de `directory`).
+        - max_gap: écart maximal en secondes entre deux positions
+                   consécutives pour permettre une interpolation.
+        """
+        self.directory = directory
+        self.store = store or os.path.join(directory, "archive")
+        self.max_gap = max_gap
+        # Fichiers sources et leurs tailles et dates de modification
+        files = sorted(glob.glob(os.path.join(directory, self.pattern)))
+        if not files:
+            raise ValueError(f"no source file found in {directory}.")
+        self.manifest = {os.path.basename(f): [os.stat(f).st_size,
+                                               os.stat(f).st_mtime_ns]
+                         for f in files}
+        # Reconstruction de l'archive si les fichiers sources ont changé
+        if self.__stored_manifest() != self.manifest:
+            self.__build(files)
+        # Relecture des tableaux en mémoire partagée
+        self.epochs, self.states, self.on_thrust = (
+            np.load(self.__path(name), mmap_mode='r')
+            for name in ('epochs', 'states', 'on_thrust'))
+        # Interpolateurs des états, construits à la demande
+        self.__interpolators = {}
+
+    def __path(self, name):
+        """Chemin d'un fichier de l'archive."""
+        return os.path.join(self.store, f"{name}.npy")
+
+    def __stored_manifest(self):
+        """Liste des fichiers sources de l'archive enregistrée."""
+        try:
+            with open(os.path.join(self.store, "manifest.json")) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __build(self, files):
+        """Fusion des fichiers sources, du plus récent au plus ancien.
+
+        Un seul fichier source est chargé en mémoire à la fois ; seules les
+        positions retenues de chacun sont conservées.
+        """
+        # Dates de création et périodes couvertes de chaque fichier
+        spans = []
+        for filename in files:
+            meta = ISS_Position(filename).meta
+            spans.append((meta['CREATION_DATE'], meta['START_TIME'],
+                          meta['STOP_TIME'], filename))
+        # Parcours du plus récent au plus ancien
+        covered, chunks = [], []
+        for _, start, stop, filename in sorted(spans, reverse=True):
+            data = ISS_Position(filename).get_data()
+            # Positions hors des périodes couvertes par des fichiers récents
+            keep = np.ones(len(data), dtype=bool)
+            for c_start, c_stop in covered:
+                keep &= ~data['datetime'].between(c_start, c_stop).to_numpy()
+            chunks.append((data['datetime'].to_numpy()[keep],
+                           data[self.columns].to_numpy()[keep],
+                           data['on_thrust'].to_numpy()[keep]))
+            covered.append((start, stop))
+        # Tri chronologique de l'ensemble
+        epochs, states, on_thrust = (np.concatenate(arrays)
+                                     for arrays in zip(*chunks))
+        order = np.argsort(epochs, kind='stable')
+        # Enregistrement des tableaux, puis du manifeste des sources
+        os.makedirs(self.store, exist_ok=True)
+        for name, array in (('epochs', epochs), ('states', states),
+                            ('on_thrust', on_thrust)):
+            np.save(self.__path(name), array[order])
+        with open(os.path.join(self.store, "manifest.json"), 'w') as file:
+            json.dump(self.manifest, file)
+
+    @staticmethod
+    def __datetimes(epochs):
+        """Conversion de dates quelconques en tableau `datetime64[ns]`."""
+        return np.atleast_1d(np.asarray(pd.to_datetime(epochs),
+                                        dtype='datetime64[ns]'))
+
+    def get_data(self, start=None, stop=None):
+        """DataFrame des positions comprises entre `start` et `stop` inclus.
+
+        La recherche des bornes s'effectue par dichotomie ; seules les
+        positions de la période sont lues depuis le disque.
+        """
+        first = (0 if start is None else
+                 np.searchsorted(self.epochs, self.__datetimes(start)[0]))
+        last = (len(self.epochs) if stop is None else
+                np.searchsorted(self.epochs, self.__datetimes(stop)[0],
+                                side='right'))
+        data = pd.DataFrame(np.asarray(self.states[first:last]),
+                            columns=self.columns)
+        data.insert(0, 'datetime', np.asarray(self.epochs[first:last]))
+        data['on_thrust'] = np.asarray(self.on_thrust[first:last])
+        return data
+
+    def segments(self):
+        """Identifiants de segment d'interpolation de chaque position.
+
+        Un segment est une séquence contiguë de positions de même état de
+        poussée (épisode de poussée) dont les dates consécutives sont
+        distantes d'au plus `max_gap` secondes.
+        """
+        on_thrust = np.asarray(self.on_thrust)
+        gaps = np.diff(self.epochs) / np.timedelta64(1, 's') > self.max_gap
+        return np.concatenate(
+            [[0], np.cumsum((on_thrust[1:] != on_thrust[:-1]) | gaps)])
+
+    def interpolator(self, method='hermite', order=None):
+        """Interpolateur des états, construit au premier appel puis réutilisé.
+
+        Les fenêtres d'interpolation ne débordent jamais d'un segment (voir
+        `segments` et `isslib.interpolation.StateInterpolator`).
+        """
+        key = (method, order)
+        if key not in self.__interpolators:
+            self.__interpolators[key] = StateInterpolator(
+                np.asarray(self.epochs), np.asarray(self.states),
+                self.segments(), method, order)
+        return self.__interpolators[key]
+
+    def state_at(self, epochs, method='hermite', order=None):
+        """Etats `(6, N)` interpolés aux dates `epochs`.
+
+        L'interpolation est celle de `ISS_Position.state_at`, par fenêtres
+        glissantes limitées à chaque segment. Les dates hors de l'archive, ou
+        encadrées par deux positions distantes de plus de `max_gap` secondes,
+        donnent des `nan`.
+
+        Paramètres:
+        - epochs: date ou tableau de dates (tout format accepté par
+                  `pandas.to_datetime`).
+        - method: méthode d'interpolation, 'hermite' ou 'lagrange'.
+        - order: nombre de points des fenêtres pour 'hermite' ou degré des
+                 polynômes pour 'lagrange' (voir `StateInterpolator`).
+        """
+        t = self.__datetimes(epochs)
+        states = self.interpolator(method, order)(t)
+        # Ecart entre les positions encadrant chaque date
+        i = np.clip(np.searchsorted(self.epochs, t, side='right') - 1,
+                    0, len(self.epochs) - 2)
+        gap = (self.epochs[i + 1] - self.epochs[i]) / np.timedelta64(1, 's')
+        return np.where(gap <= self.max_gap, states, np.nan)
+
+    def __len__(self):
+        """Nombre de positions de l'archive."""
+        return len(self.epochs)
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        return (f"ISS archive of {len(self.manifest)} files, "
+                f"{len(self)} positions from {self.epochs[0]} "
+                f"to {self.epochs[-1]}")
@@ -0,0 +1,187 @@
+"""
+isslib.atmosphere
+=================
+
+Fournit les modèles de masse volumique de l'atmosphère utilisés par la
+traînée atmosphérique : tables de masse volumique en fonction de l'altitude,
+interpolées exponentiellement, et renflement diurne du modèle de
+Harris-Priester.
+"""
+from functools import lru_cache
+import os
+
+import numpy as np
+
+# Table du modèle de Harris-Priester pour une activité solaire moyenne
+# (Montenbruck & Gill, Satellite Orbits, table 3.8) : altitude (km), masses
+# volumiques minimale (antapex) et maximale (apex du renflement diurne)
+HARRIS_PRIESTER = np.array([
+    (100, 497400.0, 497400.0), (120, 24900.0, 24900.0),
+    (130, 8377.0, 8710.0), (140, 3899.0, 4059.0), (150, 2122.0, 2215.0),
+    (160, 1263.0, 1344.0), (170, 800.8, 875.8), (180, 528.3, 601.0),
+    (190, 361.7, 429.7), (200, 255.7, 316.2), (210, 183.9, 239.6),
+    (220, 134.1, 185.3), (230, 99.49, 145.5), (240, 74.88, 115.7),
+    (250, 57.09, 93.08), (260, 44.03, 75.55), (270, 34.30, 61.82),
+    (280, 26.97, 50.95), (290, 21.39, 42.26), (300, 17.08, 35.26),
+    (320, 10.99, 25.11), (340, 7.214, 18.19), (360, 4.824, 13.37),
+    (380, 3.274, 9.955), (400, 2.249, 7.492), (420, 1.558, 5.684),
+    (440, 1.091, 4.355), (460, 0.7701, 3.362), (480, 0.5474, 2.612),
+    (500, 0.3916, 2.042), (520, 0.2819, 1.605), (540, 0.2042, 1.267),
+    (560, 0.1488, 1.005), (580, 0.1092, 0.7997), (600, 0.08070, 0.6390),
+    (620, 0.06012, 0.5123), (640, 0.04519, 0.4121), (660, 0.03430, 0.3325),
+    (680, 0.02632, 0.2691), (700, 0.02043, 0.2185), (720, 0.01607, 0.1779),
+    (740, 0.01281, 0.1452), (760, 0.01036, 0.1190), (780, 0.008496, 0.09776),
+    (800, 0.007069, 0.08059), (840, 0.004680, 0.05741),
+    (880, 0.003200, 0.04210), (920, 0.002210, 0.03130),
+    (960, 0.001560, 0.02360), (1000, 0.001150, 0.01810),
+]) * [1, 1e-12, 1e-12]  # km, g.km^-3 convertis en kg.m^-3
+
+
+@lru_cache(maxsize=None)
+def _read_density_table(filename, mtime):
+    """Lecture mise en cache d'un fichier de table, par date de
+    modification."""
+    table = np.loadtxt(filename, ndmin=2, comments='#')
+    if table.shape[1] not in (2, 3):
+        raise ValueError(f"{filename} should have 2 or 3 columns.")
+    # Une seule colonne de masse volumique : pas de renflement diurne
+    if table.shape[1] == 2:
+        table = table[:, [0, 1, 1]]
+    table.setflags(write=False)
+    return table
+
+
+def read_density_table(filename):
+    """Lecture d'un fichier de table de masse volumique.
+
+    Le fichier comprend une ligne par altitude (lignes de commentaires
+    débutant par `#`), en colonnes : altitude en km, masse volumique
+    minimale et éventuellement maximale en kg/m³ (voir `HARRIS_PRIESTER`).
+    Les tables lues sont conservées en mémoire et ne sont relues que si le
+    fichier a été modifié.
+
+    Retourne le tableau `(N, 3)` des altitudes et masses volumiques
+    minimales et maximales (identiques pour une table à deux colonnes).
+    """
+    return _read_density_table(os.path.abspath(filename),
+                               os.path.getmtime(filename))
+
+
+class DensityModel:
+    """Masse volumique de l'air en fonction de l'altitude.
+
+    Entre deux altitudes de la table, la masse volumique décroît
+    exponentiellement (hauteur d'échelle propre à chaque intervalle), soit
+    une interpolation linéaire de son logarithme. Les logarithmes sont
+    rééchantillonnés une fois pour toutes sur une grille régulière contenant
+    toutes les altitudes de la table, de sorte que l'intervalle d'une
+    altitude s'obtient par un simple calcul d'indice (noyaux compilés) ;
+    l'interpolation est vectorisée sur les positions. Hors de la table, la
+    masse volumique est celle de l'altitude extrême la plus proche.
+
+    Le renflement diurne du modèle de Harris-Priester pondère les masses
+    volumiques minimale et maximale par `cos(psi/2)^n`, où `psi` est
+    l'angle entre la position et l'apex du renflement, en retard de `lag`
+    sur la direction du Soleil. Sans direction du Soleil, la masse volumique
+    est la moyenne des deux tables.
+    """
+
+    def __init__(self, table=HARRIS_PRIESTER, exponent=2, lag=30.0):
+        """Précalcule les tables de logarithmes de la masse volumique.
+
+        Paramètres:
+        - table: tableau `(N, 3)` des altitudes (km) et masses volumiques
+                 minimales et maximales (kg/m³), ou fichier de table (voir
+                 `read_density_table`).
+        - exponent: exposant `n` du renflement diurne, de 2 pour les orbites
+                    de faible inclinaison à 6 pour les orbites polaires.
+        - lag: retard en longitude de l'apex sur le Soleil, en degrés.
+        """
+        if isinstance(table, str):
+            table = read_density_table(table)
+        altitudes, rho_min, rho_max = np.asarray(table, dtype=np.float64).T
+        if len(altitudes) < 2 or np.any(np.diff(altitudes) <= 0):
+            raise ValueError("altitudes should be strictly increasing.")
+        self.exponent = exponent
+        self.lag = lag
+        # Pas de la grille régulière : plus grand diviseur commun des
+        # intervalles de la table, au mètre près
+        metres = np.round((altitudes - altitudes[0]) * 1e3).astype(np.int64)
+        step = np.gcd.reduce(metres[1:]) * 1e-3
+        grid = altitudes[0] + step * np.arange(int(round(
+            (altitudes[-1] - altitudes[0]) / step)) + 1)
+        self.h0 = altitudes[0]
+        self.inv_step = 1 / step
+        self.grid = grid
+        # Logarithmes aux noeuds de la grille (moyenne des deux tables en
+        # première ligne)
+        self.logs = np.array([np.interp(grid, altitudes, np.log(rho))
+                              for rho in ((rho_min + rho_max) / 2, rho_min,
+                                          rho_max)])
+        # Rotation de la direction du Soleil vers l'apex, autour de l'axe z
+        cos_lag, sin_lag = np.cos(np.radians(lag)), np.sin(np.radians(lag))
+        self.lag_matrix = np.array([[cos_lag, -sin_lag, 0],
+                                    [sin_lag, cos_lag, 0], [0, 0, 1]])
+
+    def apex(self, sun):
+        """Vecteur unitaire de l'apex du renflement diurne.
+
+        `sun` est la position du Soleil dans le repère céleste (par exemple
+        `CelestialBody.position_at`) : l'apex a la même déclinaison, et une
+        ascension droite augmentée de `lag`.
+        """
+        apex = self.lag_matrix @ np.asarray(sun, dtype=np.float64)
+        return apex / np.sqrt(apex @ apex)
+
+    def density(self, altitude, cos_psi=None, derivatives=False):
+        """Masse volumique de l'air en kg/m³ aux altitudes `altitude` (km).
+
+        Paramètres:
+        - altitude: altitude ou tableau d'altitudes en km.
+        - cos_psi: cosinus de l'angle entre les positions et l'apex du
+                   renflement diurne (par défaut, masse volumique moyenne).
+        - derivatives: si vrai, retourne également les dérivées de la masse
+                       volumique par rapport à l'altitude (kg/m³/km) et à
+                       `cos_psi`.
+        """
+        altitude = np.asarray(altitude, dtype=np.float64)
+        grid, logs = self.grid, self.logs
+        if cos_psi is None:
+            rho = np.exp(np.interp(altitude, grid, logs[0]))
+            if derivatives:
+                return (rho, rho * self.__slopes(altitude, 0),
+                        np.zeros_like(rho))
+            return rho
+        rho_min = np.exp(np.interp(altitude, grid, logs[1]))
+        rho_max = np.exp(np.interp(altitude, grid, logs[2]))
+        # cos(psi/2)^n = ((1 + cos(psi)) / 2)^(n/2)
+        half = np.maximum((1 + np.asarray(cos_psi)) / 2, 0)
+        weight = half**(self.exponent / 2)
+        rho = rho_min + (rho_max - rho_min) * weight
+        if not derivatives:
+            return rho
+        slope_min = rho_min * self.__slopes(altitude, 1)
+        d_altitude = slope_min + (rho_max * self.__slopes(altitude, 2)
+                                  - slope_min) * weight
+        d_cos = ((rho_max - rho_min) * self.exponent / 4
+                 * half**(self.exponent / 2 - 1))
+        return rho, d_altitude, d_cos
+
+    def __slopes(self, altitude, row):
+        """Dérivées par rapport à l'altitude (km^-1) du logarithme de la
+        ligne `row` des tables, nulles hors de la table."""
+        x = (altitude - self.h0) * self.inv_step
+        i = np.clip(np.floor(x).astype(np.intp), 0, len(self.grid) - 2)
+        slopes = (self.logs[row, i + 1] - self.logs[row, i]) * self.inv_step
+        return np.where((x >= 0) & (x <= len(self.grid) - 1), slopes, 0)
+
+    def __repr__(self):
+        """Représentation du modèle sous forme de string."""
+        return (f"DensityModel[{self.grid[0]:g}-{self.grid[-1]:g} km, "
+                f"n={self.exponent}, lag={self.lag:g}°]")
+
+
+@lru_cache(maxsize=None)
+def harris_priester(exponent=2, lag=30.0):
+    """Modèle de Harris-Priester, construit une seule fois par paramètres."""
+    return DensityModel(HARRIS_PRIESTER, exponent, lag)
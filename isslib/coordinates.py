@@ -4,30 +4,61 @@ isslib.coordinates
 
 Fournit les fonctions de conversions de repères et coordonnées.
 """
-from astropy.coordinates import GCRS, ITRS, SkyCoord
+import math
+
+from astropy.time import Time
 import astropy.units as units
 import numpy as np
 
 
-def cartesian2spherical(x, y, z, unit='rad'):
+def cartesian2spherical(x, y, z, unit='rad', out=None):
     """Transforme des coordonnées cartésiennes en coordonnées sphériques.
 
-    La convention utilisée ici est rayon-longitude-latitude.
+    La convention utilisée ici est rayon-longitude-latitude, la longitude
+    étant comprise dans l'intervalle [0;2*pi[ (ou [0;360[ en degrés). Le
+    calcul est entièrement vectorisé ; les résultats peuvent être écrits
+    dans un triplet de tableaux préalloués `out`.
     """
-    # Représentation cartésienne
-    sk_cart = SkyCoord(x, y, z, frame=GCRS, unit=units.km,
-                       representation_type='cartesian')
-    # Représentation sphérique
-    sk_sph = sk_cart.represent_as('spherical')
-    # Retourne les distances en km et les longitude et latitudes en radians
-    if unit == 'rad':
-        return sk_sph.distance.km, sk_sph.lon.rad, sk_sph.lat.rad
-    # Retourne les distances en km et les longitude et latitudes en degrés
-    elif unit == 'deg':
-        return sk_sph.distance.km, sk_sph.lon.deg, sk_sph.lat.deg
-    # Paramètre d'unité incorrect
+    if unit not in ('rad', 'deg'):
+        raise ValueError("unit should be either 'deg' or 'rad'.")
+    x, y, z = (np.asarray(c, dtype=np.float64) for c in (x, y, z))
+    r, lon, lat = out if out is not None else (None, None, None)
+    # Rayon, puis latitude par la distance à l'axe des pôles
+    rho = np.hypot(x, y)
+    r = np.hypot(rho, z, out=r)
+    lat = np.arctan2(z, rho, out=lat)
+    # Longitude ramenée de l'intervalle ]-pi;pi] à l'intervalle [0;2*pi[
+    lon = np.arctan2(y, x, out=lon)
+    inplace = isinstance(lon, np.ndarray)
+    if inplace:
+        np.add(lon, 2*np.pi, out=lon, where=lon < 0)
     else:
+        lon = lon + 2*np.pi if lon < 0 else lon
+    # Conversion des angles en degrés (en place, sauf pour des scalaires)
+    if unit == 'deg':
+        lon = np.degrees(lon, out=lon if inplace else None)
+        lat = np.degrees(lat, out=lat if inplace else None)
+    return r, lon, lat
+
+
+def spherical2cartesian(r, lon, lat, unit='rad', out=None):
+    """Transforme des coordonnées sphériques en coordonnées cartésiennes.
+
+    Opération inverse de `cartesian2spherical`, avec la même convention
+    rayon-longitude-latitude et le même paramètre `out`.
+    """
+    if unit not in ('rad', 'deg'):
         raise ValueError("unit should be either 'deg' or 'rad'.")
+    r, lon, lat = (np.asarray(c, dtype=np.float64) for c in (r, lon, lat))
+    if unit == 'deg':
+        lon, lat = np.radians(lon), np.radians(lat)
+    x, y, z = out if out is not None else (None, None, None)
+    # Projection du rayon dans le plan équatorial
+    rho = r * np.cos(lat)
+    x = np.multiply(rho, np.cos(lon), out=x)
+    y = np.multiply(rho, np.sin(lon), out=y)
+    z = np.multiply(r, np.sin(lat), out=z)
+    return x, y, z
 
 
 def celestial2terrestrial(x, y, z, datetime, mode='cartesian'):
@@ -40,6 +71,8 @@ def celestial2terrestrial(x, y, z, datetime, mode='cartesian'):
     ou les valeurs (rayon, longitude, latitude) si le paramètre facultatif
     `mode='spherical'` est utilisé.
     """
+    # Import différé : astropy.coordinates est lent à charger
+    from astropy.coordinates import GCRS, ITRS, SkyCoord
     # coordonnées sidérales depuis les données
     geo = SkyCoord(x=x, y=y, z=z, unit=units.km, frame=GCRS,
                    representation_type='cartesian',
@@ -56,49 +89,209 @@ def celestial2terrestrial(x, y, z, datetime, mode='cartesian'):
         raise ValueError("mode should be either 'cartesian' or 'spherical'.")
 
 
+def celestial2terrestrial_matrices(datetimes):
+    """Matrices de rotation du repère céleste vers le repère terrestre.
+
+    Les matrices sont calculées en un unique appel à astropy pour l'ensemble
+    des dates fournies, par transformation des vecteurs de la base
+    cartésienne. Retourne un tableau de dimensions `(N, 3, 3)` tel que
+    `matrices[i] @ r` soit le vecteur `r` exprimé dans le repère terrestre à
+    la date `datetimes[i]` (une matrice `(3, 3)` pour une date isolée).
+    """
+    # Import différé : astropy.coordinates est lent à charger
+    from astropy.coordinates import GCRS, ITRS, CartesianRepresentation
+    datetimes = Time(datetimes)
+    # Une date isolée est traitée comme un tableau d'une date
+    scalar = datetimes.isscalar
+    if scalar:
+        datetimes = datetimes.reshape(1)
+    # Vecteurs de base (composantes, vecteurs) répétés pour chaque date
+    basis = np.broadcast_to(np.eye(3)[..., np.newaxis],
+                            (3, 3) + datetimes.shape)
+    # Transformation groupée des vecteurs de base vers le repère terrestre
+    geo = GCRS(CartesianRepresentation(basis, unit=units.km),
+               obstime=datetimes).transform_to(ITRS(obstime=datetimes))
+    # Les images des vecteurs de base sont les colonnes des matrices
+    matrices = np.moveaxis(geo.cartesian.xyz.value, -1, 0)
+    return matrices[0] if scalar else matrices
+
+
+def rotate_vectors(matrices, vectors, out=None):
+    """Applique des matrices de rotation précalculées à des vecteurs.
+
+    `matrices` est une matrice `(3, 3)` ou un tableau `(N, 3, 3)` (par
+    exemple issu de `celestial2terrestrial_matrices` ou de
+    `EarthRotation.matrix`) et `vectors` un tableau `(3, N)` : chaque
+    vecteur est transformé par la matrice de même indice. Retourne un tableau
+    `(3, N)`, écrit dans `out` si fourni. Appliqué à des positions célestes,
+    le résultat est leur expression dans le repère terrestre.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    vectors = np.asarray(vectors, dtype=np.float64)
+    # Matrice unique commune à tous les vecteurs
+    if matrices.ndim == 2:
+        return np.matmul(matrices, vectors, out=out)
+    return np.einsum('nij,jn->in', matrices, vectors, out=out)
+
+
+class EarthRotation:
+    """Table précalculée des rotations du repère céleste au repère terrestre.
+
+    Les matrices de rotation GCRS→ITRS sont calculées une seule fois sur une
+    grille temporelle, puis interpolées à tout instant `t` (en secondes depuis
+    `t0`). La rotation propre de la Terre, rapide, est retirée des matrices
+    avant interpolation et réappliquée analytiquement : seule la partie lente
+    (précession, nutation, mouvement du pôle) est interpolée linéairement.
+
+    Le pas de la grille règle le compromis entre précision et coût de
+    construction : avec le pas par défaut d'une heure, l'écart angulaire au
+    calcul exact d'astropy reste de l'ordre de 2e-8 rad, soit environ un
+    décimètre à l'altitude de l'ISS (quelques mètres pour un pas de 6 heures).
+    """
+
+    # Vitesse angulaire de rotation terrestre (rad.s^-1)
+    omega = 7.292115146706979e-5
+
+    def __init__(self, t0, duration, step=3600):
+        """Précalcule la table de rotation sur l'intervalle `[0, duration]`.
+
+        Paramètres:
+        - t0: date de référence des temps relatifs.
+        - duration: durée en secondes couverte par la table.
+        - step: pas en secondes de la grille d'interpolation.
+        """
+        if step <= 0:
+            raise ValueError("step should be strictly positive.")
+        self.t0 = Time(t0)
+        self.step = step
+        # Grille temporelle, avec un point de marge au-delà de la durée
+        num_points = int(np.ceil(duration / step)) + 2
+        self.t = np.arange(num_points) * step
+        # Calcul groupé des matrices exactes aux noeuds de la grille
+        matrices = celestial2terrestrial_matrices(self.t0 + self.t * units.s)
+        # Retrait de la rotation propre de la Terre : partie lente résiduelle
+        self.__residuals = self.__spin(-self.t) @ matrices
+
+    def __spin(self, t):
+        """Matrices de rotation propre de la Terre autour de l'axe z."""
+        theta = self.omega * np.asarray(t, dtype=np.float64)
+        cos, sin = np.cos(theta), np.sin(theta)
+        zeros, ones = np.zeros_like(theta), np.ones_like(theta)
+        return np.moveaxis(np.array([[cos, sin, zeros],
+                                     [-sin, cos, zeros],
+                                     [zeros, zeros, ones]]), (0, 1), (-2, -1))
+
+    def matrix(self, t):
+        """Matrice(s) de rotation GCRS→ITRS interpolée(s) au(x) temps `t`.
+
+        Retourne une matrice `(3, 3)` pour un temps scalaire, ou un tableau
+        `(N, 3, 3)` pour un tableau de `N` temps.
+        """
+        t = np.asarray(t, dtype=np.float64)
+        # Cas scalaire, fréquent lors des intégrations : calcul direct
+        if t.ndim == 0:
+            return self.__scalar_matrix(float(t))
+        if np.any(t < self.t[0]) or np.any(t > self.t[-1]):
+            raise ValueError("t should be within the rotation table range.")
+        # Indices des noeuds encadrants et poids d'interpolation
+        i = np.minimum((t // self.step).astype(int), len(self.t) - 2)
+        w = (t - self.t[i])[..., np.newaxis, np.newaxis] / self.step
+        # Interpolation linéaire de la partie lente
+        residual = (1 - w) * self.__residuals[i] + w * self.__residuals[i + 1]
+        # Réapplication de la rotation propre de la Terre
+        return self.__spin(t) @ residual
+
+    def __scalar_matrix(self, t):
+        """Matrice de rotation au temps scalaire `t`, sans vectorisation."""
+        if not self.t[0] <= t <= self.t[-1]:
+            raise ValueError("t should be within the rotation table range.")
+        i = min(int(t // self.step), len(self.t) - 2)
+        w = (t - self.t[i]) / self.step
+        residual = (1 - w) * self.__residuals[i] + w * self.__residuals[i + 1]
+        cos, sin = math.cos(self.omega * t), math.sin(self.omega * t)
+        return np.array([[cos, sin, 0], [-sin, cos, 0], [0, 0, 1]]) @ residual
+
+    def rotate(self, r, t):
+        """Exprime dans le repère terrestre un vecteur céleste au temps `t`.
+
+        `r` est un vecteur de dimension 3, ou un tableau `(3, N)` de vecteurs
+        pris au même temps `t`.
+        """
+        return self.matrix(t) @ r
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        return (f"EarthRotation from {self.t0.isot} over {self.t[-1]} s "
+                f"(step={self.step} s)")
+
+
 def worldmap_traces(longitudes, latitudes, join_traces=True):
-    """Séparation de tableaux de longitudes/latitudes en traces planisphère."""
+    """Séparation de tableaux de longitudes/latitudes en traces planisphère.
+
+    Les traces sont découpées aux retours arrières de longitude (passage de
+    l'antiméridien). Avec `join_traces`, chaque trace est prolongée hors
+    champ par les positions voisines des traces précédente et suivante,
+    décalées de 360°. Le découpage est vectorisé : les positions de jonction
+    sont insérées en une fois avant une unique séparation des tableaux.
+    """
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
     # Position des retours arrières
-    crs = np.where(np.diff(longitudes) < -300)[0] + 1
-    # Tableau des débuts de traces
-    line_starts = np.concatenate([[0], crs])
-    # Tableau des fin de traces
-    line_ends = np.concatenate([crs, [len(longitudes)]])
-    # Séparation des traces
-    traces = [(longitudes[start:end], latitudes[start:end])
-              for (start, end) in zip(line_starts, line_ends)]
-    # Si création de traces jointes sur les bords
-    if join_traces:
-        jtraces = [None] * len(traces)
-        for i in range(len(traces)):
-            # Ajout hors-champ de la position précédente à gauche
-            in_lon, in_lat = ((traces[i-1][0][-1:] - 360,
-                               traces[i-1][1][-1:])
-                              if i > 0 else ([], []))
-            # Ajout hors-champ de la position suivante à droite
-            out_lon, out_lat = (([traces[i+1][0][:1] + 360,
-                                  traces[i+1][1][:1]])
-                                if i < len(traces) - 1 else ([], []))
-            # Création des nouvelles traces
-            jtraces[i] = (np.concatenate([in_lon, traces[i][0], out_lon]),
-                          np.concatenate([in_lat, traces[i][1], out_lat]))
-        return jtraces
-    else:
-        return traces
+    crs = np.flatnonzero(np.diff(longitudes) < -300) + 1
+    if not join_traces:
+        return list(zip(np.split(longitudes, crs), np.split(latitudes, crs)))
+    # A chaque retour arrière `c`, insertion de la position suivante à
+    # droite (fin de la trace précédente) puis de la position précédente à
+    # gauche (début de la trace suivante)
+    at = np.repeat(crs, 2)
+    lon = np.insert(longitudes, at, np.column_stack(
+        [longitudes[crs] + 360, longitudes[crs - 1] - 360]).ravel())
+    lat = np.insert(latitudes, at, np.column_stack(
+        [latitudes[crs], latitudes[crs - 1]]).ravel())
+    # Séparation entre les deux positions insérées à chaque retour arrière
+    splits = crs + 2 * np.arange(len(crs)) + 1
+    return list(zip(np.split(lon, splits), np.split(lat, splits)))
+
+
+def worldmap_path(longitudes, latitudes, join_traces=True):
+    """Traces planisphère réunies en un seul couple de tableaux.
+
+    Les traces de `worldmap_traces` sont concaténées, séparées par des
+    valeurs `nan` qui interrompent le tracé : l'ensemble se représente en un
+    unique appel à `plt.plot`.
+    """
+    traces = worldmap_traces(longitudes, latitudes, join_traces)
+    gap = np.array([np.nan])
+    return tuple(np.concatenate([part for trace in traces
+                                 for part in (trace[k], gap)][:-1])
+                 for k in range(2))
+
 
+def _wrap(value, low, out=None):
+    """Angle en radian ramené dans l'intervalle [low;low+2*pi[."""
+    value = np.asarray(value, dtype=np.float64)
+    # Copie préalable si le résultat doit être écrit sur l'angle lui-même
+    if out is not None and np.shares_memory(out, value):
+        value = value.copy()
+    # Nombre de tours complets au-delà de la borne inférieure
+    turns = np.multiply(np.subtract(value, low, out=out), 1 / (2*np.pi),
+                        out=out)
+    turns = np.floor(turns, out=out)
+    # Retrait des tours complets (plus rapide que `np.remainder`)
+    return np.subtract(value, np.multiply(turns, 2*np.pi, out=out), out=out)
 
-def pi_interval(value):
-    """Convertit un angle en radian à son égal dans l'intervalle [-pi;pi[."""
-    # Utilise la position du point relatif dans le cercle complexe
-    return np.angle(complex(np.cos(value), np.sin(value)))
 
+def pi_interval(value, out=None):
+    """Convertit un angle en radian à son égal dans l'intervalle [-pi;pi[.
 
-def positive_pi(value):
-    """Convertit un angle en radian à son égal dans l'intervalle [0;2*pi[."""
-    # Utilise le modulo 2pi de son égal dans l'intervalle [-pi;pi[
-    return pi_interval(value) % (2*np.pi)
+    Fonction vectorisée, pouvant écrire son résultat dans le tableau `out`.
+    """
+    return _wrap(value, -np.pi, out)
 
 
-# Vectorise les fonctions `pi_interval` et `positive_pi`
-pi_interval = np.vectorize(pi_interval)
-positive_pi = np.vectorize(positive_pi)
+def positive_pi(value, out=None):
+    """Convertit un angle en radian à son égal dans l'intervalle [0;2*pi[.
+
+    Fonction vectorisée, pouvant écrire son résultat dans le tableau `out`.
+    """
+    return _wrap(value, 0, out)
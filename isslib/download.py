@@ -0,0 +1,261 @@
+"""
+isslib.download
+===============
+
+Fournit le téléchargement des fichiers de coordonnées de l'ISS : écriture
+en flux dans un fichier temporaire renommé atomiquement, requêtes
+conditionnelles, connexions réutilisées et téléchargements concurrents.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import json
+import os
+import tempfile
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:
+    # Verrouillage inter-processus disponible uniquement sur les systèmes
+    # Unix : ailleurs, seul le renommage atomique protège les fichiers
+    fcntl = None
+
+# Permalien du fichier courant depuis le bucket public de la NASA
+CURRENT_URL = ("https://nasa-public-data.s3.amazonaws.com/iss-coords/current/"
+               "ISS_OEM/ISS.OEM_J2K_EPH.txt")
+
+# Modèle d'adresse des fichiers archivés, par date de publication
+ARCHIVE_URL = ("https://nasa-public-data.s3.amazonaws.com/iss-coords/"
+               "{date:%Y-%m-%d}/ISS_OEM/ISS.OEM_J2K_EPH.txt")
+
+# Première ligne attendue d'un fichier source au format CCSDS OEM
+OEM_SIGNATURE = b"CCSDS_OEM_VERS"
+
+
+@lru_cache(maxsize=None)
+def _umask():
+    """Masque de création des fichiers du processus, lu une seule fois.
+
+    La lecture du masque passe par sa modification : il est aussitôt
+    restauré, la valeur provisoire la plus restrictive protégeant les
+    fichiers qu'un autre fil d'exécution créerait entre-temps.
+    """
+    umask = os.umask(0o077)
+    os.umask(umask)
+    return umask
+
+
+class Downloader:
+    """Téléchargeur des fichiers sources de coordonnées de l'ISS.
+
+    Les connexions sont réutilisées par une session `requests` commune, avec
+    nouvelles tentatives automatiques en cas d'erreur serveur. Les en-têtes
+    `ETag` et `Last-Modified` de chaque fichier téléchargé sont enregistrés
+    à côté de celui-ci (fichier `.http.json`) : les téléchargements suivants
+    sont conditionnels et un fichier inchangé n'est pas retransféré.
+
+    Chaque fichier est écrit en flux dans un fichier temporaire du même
+    répertoire, validé, puis renommé atomiquement : un fichier local est
+    toujours complet, et ses permissions sont celles d'un fichier créé
+    normalement (masque `umask` du processus). Un verrou par fichier
+    (systèmes Unix), rangé dans le sous-répertoire `.locks`, évite en outre
+    que plusieurs processus démarrés simultanément téléchargent le même
+    fichier.
+    """
+
+    def __init__(self, directory="data", archive_url=ARCHIVE_URL,
+                 max_workers=4, retries=3, timeout=30):
+        """Instancie le téléchargeur.
+
+        Paramètres:
+        - directory: répertoire des fichiers téléchargés.
+        - archive_url: modèle d'adresse des fichiers archivés, formaté avec
+                       la date `date` (par exemple vers un serveur local de
+                       test).
+        - max_workers: nombre maximal de téléchargements simultanés.
+        - retries: nombre de nouvelles tentatives par requête.
+        - timeout: délai maximal d'attente du serveur, en secondes.
+        """
+        self.directory = directory
+        self.archive_url = archive_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Permissions des fichiers écrits, selon le masque du processus
+        self.__mode = 0o666 & ~_umask()
+        # Session commune, dont le groupe de connexions est dimensionné pour
+        # les téléchargements simultanés
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers,
+            max_retries=Retry(total=retries, backoff_factor=0.5,
+                              status_forcelist=(429, 500, 502, 503, 504)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def __validators_file(filename):
+        """Fichier des en-têtes de validation d'un fichier téléchargé."""
+        return f"{filename}.http.json"
+
+    def __validators(self, filename):
+        """En-têtes de requête conditionnelle d'un fichier local."""
+        if not os.path.exists(filename):
+            return {}
+        try:
+            with open(self.__validators_file(filename)) as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        headers = {}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('last_modified'):
+            headers['If-Modified-Since'] = stored['last_modified']
+        return headers
+
+    @staticmethod
+    @contextmanager
+    def __lock(filename):
+        """Verrou exclusif inter-processus associé à `filename`.
+
+        Les fichiers de verrou sont rangés dans le sous-répertoire `.locks`
+        du répertoire de `filename`.
+        """
+        if fcntl is None:
+            yield
+            return
+        directory, name = os.path.split(os.path.abspath(filename))
+        locks = os.path.join(directory, ".locks")
+        os.makedirs(locks, exist_ok=True)
+        with open(os.path.join(locks, f"{name}.lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __replace(self, content, filename, mode='wb', size=None):
+        """Ecriture atomique de `content` (itérable de blocs) en `filename`.
+
+        Si la taille attendue `size` est connue, le fichier temporaire n'est
+        renommé que si elle est respectée. Le fichier temporaire, créé en
+        accès réservé au propriétaire, reçoit les permissions usuelles avant
+        d'être renommé.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix=".part")
+        try:
+            written = 0
+            with os.fdopen(fd, mode) as file:
+                for block in content:
+                    file.write(block)
+                    written += len(block)
+            if size is not None and written != int(size):
+                raise IOError(f"incomplete download of {filename}.")
+            os.chmod(temporary, self.__mode)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def fetch(self, url, filename, force=False):
+        """Télécharge `url` en `filename` ; retourne vrai s'il a changé.
+
+        Un fichier local existant n'est revalidé auprès du serveur que si
+        `force` est vrai, par une requête conditionnelle : il n'est
+        retransféré que s'il a changé.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(filename)),
+                    exist_ok=True)
+        with self.__lock(filename):
+            # Fichier obtenu entre-temps par un autre processus
+            if os.path.exists(filename) and not force:
+                return False
+            headers = self.__validators(filename)
+            with self.session.get(url, headers=headers, stream=True,
+                                  timeout=self.timeout) as response:
+                if response.status_code == 304:
+                    return False
+                response.raise_for_status()
+                chunks = response.iter_content(chunk_size=1 << 16)
+                # Validation du format sur le premier bloc non vide
+                first = next((chunk for chunk in chunks if chunk), b"")
+                if not first.startswith(OEM_SIGNATURE):
+                    raise ValueError(f"{url} is not a CCSDS OEM file.")
+                # Taille annoncée, contrôlable hors compression
+                size = response.headers.get('Content-Length')
+                if 'Content-Encoding' in response.headers:
+                    size = None
+                self.__replace(self.__chain(first, chunks), filename,
+                               size=size)
+                validators = {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+            self.__replace([json.dumps(validators)],
+                           self.__validators_file(filename), 'w')
+        return True
+
+    @staticmethod
+    def __chain(first, chunks):
+        """Blocs de la réponse, le premier ayant déjà été lu."""
+        yield first
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+
+    def filename(self, date):
+        """Nom du fichier local de la date de publication `date`."""
+        return os.path.join(self.directory,
+                            f"ISS.OEM_J2K_EPH_{date:%Y%m%d}.txt")
+
+    def current(self, force=False):
+        """Télécharge le fichier courant sous le nom du jour ; retourne son
+        nom."""
+        filename = self.filename(pd.Timestamp.today())
+        self.fetch(CURRENT_URL, filename, force)
+        return filename
+
+    def fetch_range(self, start, stop, force=False):
+        """Télécharge simultanément les fichiers archivés de `start` à `stop`.
+
+        Au plus `max_workers` téléchargements sont menés simultanément.
+        Retourne un dictionnaire associant à chaque fichier local l'erreur
+        rencontrée, ou `None` en cas de succès (fichiers absents du serveur
+        compris, afin qu'un échec n'interrompe pas les autres
+        téléchargements).
+        """
+        dates = pd.date_range(pd.Timestamp(start).normalize(),
+                              pd.Timestamp(stop).normalize(), freq='D')
+
+        def task(date):
+            """Téléchargement d'un fichier archivé."""
+            filename = self.filename(date)
+            try:
+                self.fetch(self.archive_url.format(date=date), filename,
+                           force)
+            except (requests.RequestException, ValueError, OSError) as error:
+                return filename, error
+            return filename, None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(executor.map(task, dates))
+
+    def close(self):
+        """Fermeture des connexions de la session."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        """Représentation du téléchargeur sous forme de string."""
+        return f"Downloader[{self.directory}, {self.max_workers} workers]"
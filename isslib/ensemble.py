@@ -0,0 +1,153 @@
+"""
+isslib.ensemble
+===============
+
+Fournit l'exécution parallèle de propagations sur un ensemble de fichiers de
+coordonnées de l'ISS et de leurs épisodes de mouvement libre.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+import time
+
+import astropy.coordinates as co
+import numpy as np
+import pandas as pd
+
+from isslib.atmosphere import harris_priester
+from isslib.coordinates import EarthRotation
+from isslib.force import (AtmosphericDrag, BodyInfluence, CelestialBody,
+                          ForceSet)
+from isslib.gravity import HarmonicGeopotential
+from isslib.position import ISS_Position
+
+# Colonnes des coordonnées cartésiennes des données sources
+COLUMNS = ['x', 'y', 'z', 'vx', 'vy', 'vz']
+
+
+def standard_forceset(iss, t0, duration):
+    """Jeu de forces de référence pour un arc débutant à la date `t0`.
+
+    Le jeu comprend le géopotentiel de degré 2 en harmoniques sphériques
+    (termes C20, C22 et S22, avec table de rotation terrestre couvrant
+    `duration` secondes), la traînée atmosphérique paramétrée par les
+    métadonnées du fichier source, dans l'atmosphère de Harris-Priester
+    orientée par le Soleil, et l'influence de la Lune et du Soleil, dont les
+    éphémérides sont précalculées sur l'arc.
+    """
+    # Corps tiers
+    moon = CelestialBody('Lune', 7.342e22, partial(co.get_body, 'moon'), t0)
+    sun = CelestialBody('Soleil', 1.988e30, co.get_sun, t0)
+    for body in (moon, sun):
+        body.cache(0, duration)
+    # Traînée atmosphérique paramétrée par les métadonnées, avec renflement
+    # diurne
+    drag = AtmosphericDrag(iss.get_metadata("MASS"),
+                           iss.get_metadata("DRAG_COEFF"),
+                           iss.get_metadata("DRAG_AREA"),
+                           harris_priester(), sun)
+    return ForceSet([HarmonicGeopotential(t0, EarthRotation(t0, duration)),
+                     drag, BodyInfluence(moon), BodyInfluence(sun)])
+
+
+def free_flight_episodes(iss, min_points=2):
+    """Identifiants des épisodes de mouvement libre d'au moins `min_points`."""
+    # Nombre de positions de chaque épisode sans poussée
+    free = iss.get_data().query('~on_thrust')
+    counts = free.groupby('thrust_episode').size()
+    return counts[counts >= min_points].index.tolist()
+
+
+@lru_cache(maxsize=4)
+def _load(filename):
+    """Chargement (mis en cache par processus) d'un fichier source."""
+    return ISS_Position(filename)
+
+
+def _limit_memory(max_memory):
+    """Initialisation d'un processus : plafonnement de sa mémoire virtuelle."""
+    if max_memory:
+        # Module disponible uniquement sur les systèmes Unix
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (int(max_memory), hard))
+
+
+def propagate_arc(filename, episode, build_forceset=standard_forceset,
+                  max_duration=None, **solve_kwargs):
+    """Propagation d'un épisode de mouvement libre et résidus aux données.
+
+    L'arc est propagé par `ForceSet.solve_adaptive` depuis sa première
+    position et échantillonné aux dates des données sources. Retourne un
+    dictionnaire de statistiques des résidus de position (en km).
+
+    Paramètres:
+    - filename: fichier source de coordonnées de l'ISS.
+    - episode: identifiant de l'épisode de mouvement libre.
+    - build_forceset: fonction `(iss, t0, duration)` construisant le jeu de
+                      forces (elle doit pouvoir être transmise aux processus).
+    - max_duration: durée maximale propagée en secondes.
+    - solve_kwargs: paramètres supplémentaires de `solve_adaptive`.
+    """
+    start = time.perf_counter()
+    iss = _load(filename)
+    # Données de l'épisode
+    arc = iss.get_data().query('thrust_episode == @episode')
+    t0 = arc.iloc[0]['datetime']
+    # Dates de sortie en secondes depuis le début de l'arc
+    t_eval = (arc['datetime'] - t0).dt.total_seconds().to_numpy()
+    if max_duration is not None:
+        t_eval = t_eval[t_eval <= max_duration]
+    source = arc[COLUMNS].to_numpy(dtype=np.float64)[:len(t_eval)].T
+    # Propagation depuis la première position de l'arc
+    forceset = build_forceset(iss, t0, t_eval[-1])
+    _, v = forceset.solve_adaptive(t_eval, source[:, 0], **solve_kwargs)
+    # Résidus de position
+    residuals = np.linalg.norm(v[:3] - source[:3], axis=0)
+    return {
+        'file': filename, 'episode': episode, 'start': t0,
+        'duration': t_eval[-1], 'points': len(t_eval),
+        'rms': np.sqrt(np.nanmean(residuals**2)),
+        'max': np.nanmax(residuals), 'final': residuals[-1],
+        'nfev': forceset.stats['nfev'],
+        'wall_time': time.perf_counter() - start,
+    }
+
+
+def _propagate_task(task, **kwargs):
+    """Propagation d'un arc décrit par un couple (fichier, épisode)."""
+    return propagate_arc(*task, **kwargs)
+
+
+def run_ensemble(sources, workers=None, max_memory=None, min_points=2,
+                 **kwargs):
+    """Propagation parallèle des arcs de mouvement libre d'un ensemble.
+
+    Chaque arc est propagé dans un processus d'un `ProcessPoolExecutor`. Les
+    résultats sont rassemblés dans un DataFrame indexé par fichier et
+    épisode, dans l'ordre des sources fournies quel que soit l'ordre
+    d'achèvement des calculs.
+
+    Paramètres:
+    - sources: liste de fichiers sources, ou de couples
+               `(fichier, [épisodes])` pour restreindre les épisodes traités
+               (par défaut, tous les épisodes de mouvement libre).
+    - workers: nombre de processus (par défaut, le nombre de processeurs).
+    - max_memory: plafond de mémoire virtuelle par processus, en octets
+                  (systèmes Unix uniquement).
+    - min_points: nombre minimal de positions d'un épisode retenu.
+    - kwargs: paramètres supplémentaires de `propagate_arc`.
+    """
+    # Liste ordonnée des arcs à propager
+    tasks = []
+    for source in sources:
+        filename, episodes = ((source, None) if isinstance(source, str)
+                              else source)
+        if episodes is None:
+            episodes = free_flight_episodes(_load(filename), min_points)
+        tasks += [(filename, episode) for episode in episodes]
+    # Distribution des arcs aux processus, résultats dans l'ordre des tâches
+    with ProcessPoolExecutor(max_workers=workers, initializer=_limit_memory,
+                             initargs=(max_memory,)) as executor:
+        results = list(executor.map(partial(_propagate_task, **kwargs),
+                                    tasks))
+    return pd.DataFrame(results).set_index(['file', 'episode'])
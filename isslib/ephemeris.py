@@ -0,0 +1,205 @@
+"""
+isslib.ephemeris
+================
+
+Fournit le cache d'éphémérides des corps tiers (Soleil, Lune) par
+interpolation polynomiale.
+"""
+from collections import OrderedDict
+
+from astropy.time import Time
+import astropy.units as units
+import numpy as np
+from numpy.polynomial import chebyshev
+import pandas as pd
+
+
+class EphemerisCache:
+    """Cache des positions d'un corps par interpolants de Tchebychev.
+
+    L'axe des temps est découpé en segments de durée fixe, ancrés sur
+    l'époque J2000 de sorte que les segments soient réutilisables d'une date
+    de référence à l'autre. Sur chaque segment, les coordonnées du corps sont
+    interpolées par un polynôme de Tchebychev calculé à partir d'une unique
+    évaluation vectorisée de la fonction de position : l'accès à une position
+    se réduit ensuite à l'évaluation d'un polynôme.
+
+    Les segments sont conservés dans un cache LRU de taille bornée, et peuvent
+    être enregistrés sur disque (`save`) puis rechargés (`load`) pour éviter
+    tout appel à astropy lors d'exécutions ultérieures sur les mêmes dates.
+    Le fichier enregistré précise le nom du corps et la période couverte,
+    contrôlés au rechargement.
+    """
+
+    # Epoque d'ancrage des segments
+    epoch = Time('J2000')
+
+    def __init__(self, position_callback, t0=None, segment=86400, degree=12,
+                 max_segments=1024, name=None):
+        """Instancie un cache vide.
+
+        Paramètres:
+        - position_callback: fonction de position du corps, prenant en
+                             paramètre un `astropy.time.Time` (par exemple
+                             `astropy.coordinates.get_sun`).
+        - t0: date correspondant au temps `t=0` (par défaut, maintenant).
+        - segment: durée en secondes d'un segment d'interpolation.
+        - degree: degré des polynômes d'interpolation.
+        - max_segments: nombre maximal de segments conservés en mémoire.
+        - name: nom du corps, enregistré avec les segments (par défaut,
+                anonyme).
+        """
+        self.pos = position_callback
+        self.name = name
+        self.t0 = Time(pd.Timestamp.now() if t0 is None else t0)
+        self.segment = segment
+        self.degree = degree
+        self.max_segments = max_segments
+        # Décalage en secondes de t0 par rapport à l'époque d'ancrage
+        self.offset = (self.t0 - self.epoch).sec
+        # Noeuds de Tchebychev dans l'intervalle normalisé [-1, 1]
+        self.nodes = chebyshev.chebpts1(degree + 1)
+        # Coefficients des segments, du moins au plus récemment utilisé
+        self.segments = OrderedDict()
+
+    def __compute(self, keys):
+        """Calcul groupé des coefficients des segments d'indices `keys`."""
+        keys = np.asarray(keys)
+        # Temps des noeuds de chaque segment, depuis l'époque d'ancrage
+        seconds = (keys[:, np.newaxis] + (self.nodes + 1) / 2) * self.segment
+        # Evaluation vectorisée unique des positions aux noeuds (km)
+        xyz = (self.pos(self.epoch + seconds.ravel() * units.s)
+               .represent_as('cartesian').xyz.to(units.km).value)
+        # Valeurs aux noeuds, regroupées par noeud : (noeuds, segments*3)
+        values = (xyz.reshape(3, len(keys), -1).transpose(2, 1, 0)
+                  .reshape(len(self.nodes), -1))
+        # Ajustement simultané des polynômes de tous les segments
+        coeffs = chebyshev.chebfit(self.nodes, values, self.degree)
+        for i, key in enumerate(keys):
+            self.__store(int(key), coeffs[:, 3*i:3*i + 3])
+
+    def __store(self, key, coeffs):
+        """Ajout d'un segment au cache, en évinçant le moins utilisé."""
+        self.segments[key] = coeffs
+        self.segments.move_to_end(key)
+        while len(self.segments) > self.max_segments:
+            self.segments.popitem(last=False)
+
+    def __keys(self, t):
+        """Indices des segments et abscisses normalisées des temps `t`."""
+        seconds = self.offset + np.asarray(t, dtype=np.float64)
+        keys = np.floor(seconds / self.segment)
+        return keys.astype(int), 2 * (seconds / self.segment - keys) - 1
+
+    def prefetch(self, t_start, t_stop):
+        """Calcule en un seul appel les segments couvrant `[t_start, t_stop]`.
+
+        Les temps sont exprimés en secondes depuis `t0`.
+        """
+        first, last = self.__keys([t_start, t_stop])[0]
+        missing = [key for key in range(first, last + 1)
+                   if key not in self.segments]
+        if missing:
+            self.__compute(missing)
+
+    def position_at(self, t):
+        """Coordonnées cartésiennes kilométriques du corps au temps `t`.
+
+        Retourne un vecteur de dimension 3 pour un temps scalaire, ou un
+        tableau `(3, N)` pour un tableau de `N` temps.
+        """
+        keys, x = self.__keys(t)
+        # Cas scalaire : évaluation directe du polynôme du segment
+        if keys.ndim == 0:
+            return self.__chebval(float(x), self.__coeffs(int(keys)))
+        # Calcul groupé des segments manquants
+        missing = [key for key in np.unique(keys) if key not in self.segments]
+        if missing:
+            self.__compute(missing)
+        # Cas vectoriel : évaluation par segment
+        position = np.empty((3,) + keys.shape)
+        for key in np.unique(keys):
+            mask = keys == key
+            position[:, mask] = chebyshev.chebval(x[mask], self.__coeffs(key))
+        return position
+
+    @staticmethod
+    def __chebval(x, coeffs):
+        """Evaluation d'un polynôme en un point scalaire.
+
+        Les polynômes de Tchebychev sont calculés par leur récurrence sur
+        des flottants Python, puis combinés en un unique produit matriciel :
+        bien plus rapide que `chebyshev.chebval` pour un point isolé.
+        """
+        T = [1.0, x]
+        for _ in range(len(coeffs) - 2):
+            T.append(2 * x * T[-1] - T[-2])
+        return np.array(T[:len(coeffs)]) @ coeffs
+
+    def __coeffs(self, key):
+        """Coefficients du segment d'indice `key`, marqué comme utilisé."""
+        # Segment évincé entre-temps (cache plus petit que la requête)
+        if key not in self.segments:
+            self.__compute([key])
+        self.segments.move_to_end(key)
+        return self.segments[key]
+
+    def span(self):
+        """Période couverte par les segments du cache, en secondes depuis
+        `t0` (intervalle vide pour un cache vide)."""
+        if not self.segments:
+            return 0.0, 0.0
+        return (min(self.segments) * self.segment - self.offset,
+                (max(self.segments) + 1) * self.segment - self.offset)
+
+    def save(self, filename):
+        """Enregistre les segments du cache dans un fichier `.npz`.
+
+        Le fichier comprend également le nom du corps et la période couverte,
+        exprimée en secondes depuis l'époque d'ancrage.
+        """
+        start, stop = (self.offset + t for t in self.span())
+        np.savez(filename, segment=self.segment, degree=self.degree,
+                 name=self.name or '', start=start, stop=stop,
+                 keys=np.array(list(self.segments), dtype=int),
+                 coeffs=np.array(list(self.segments.values())).reshape(
+                     len(self.segments), self.degree + 1, 3))
+
+    def load(self, filename, t_start=None, t_stop=None):
+        """Ajoute au cache les segments enregistrés dans un fichier `.npz`.
+
+        Le fichier doit avoir été produit avec les mêmes durée de segment et
+        degré d'interpolation, pour le même corps (si le cache et le fichier
+        sont nommés).
+
+        Paramètres:
+        - filename: fichier produit par `save`.
+        - t_start, t_stop: période en secondes depuis `t0` que le fichier
+                           doit couvrir (par défaut, non contrôlée).
+        """
+        with np.load(filename) as npz:
+            if npz['segment'] != self.segment or npz['degree'] != self.degree:
+                raise ValueError("cache file segment and degree should match "
+                                 "the cache parameters.")
+            if 'name' not in npz.files:
+                raise ValueError("cache file should record the body name and "
+                                 "time span.")
+            name = str(npz['name'])
+            if self.name and name and name != self.name:
+                raise ValueError(f"cache file is for {name}, not "
+                                 f"{self.name}.")
+            start, stop = (float(npz[key]) - self.offset
+                           for key in ('start', 'stop'))
+            if ((t_start is not None and t_start < start)
+                    or (t_stop is not None and t_stop > stop)):
+                raise ValueError("cache file time span should cover the "
+                                 "requested times.")
+            for key, coeffs in zip(npz['keys'], npz['coeffs']):
+                self.__store(int(key), coeffs)
+        return self
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        name = f"[{self.name}]" if self.name else ""
+        return (f"EphemerisCache{name} of {len(self.segments)} segments "
+                f"(segment={self.segment} s, degree={self.degree})")
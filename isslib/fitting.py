@@ -0,0 +1,101 @@
+"""
+isslib.fitting
+==============
+
+Fournit l'ajustement par moindres carrés des coordonnées initiales et des
+paramètres des forces (par exemple le coefficient de traînée) aux positions
+d'un épisode de mouvement libre de l'ISS.
+"""
+import time
+
+import numpy as np
+
+from isslib.ensemble import COLUMNS, standard_forceset
+
+
+def fit_arc(iss, episode, build_forceset=standard_forceset,
+            parameters=('drag_coeff',), max_iter=10, tol=1e-3,
+            max_duration=None, **solve_kwargs):
+    """Ajustement d'un épisode de mouvement libre par Gauss-Newton.
+
+    A chaque itération, une seule propagation des équations variationnelles
+    (`ForceSet.solve_variational`) fournit à la fois les résidus de position
+    aux dates des données sources et leurs dérivées par rapport aux
+    coordonnées initiales et aux paramètres. La correction est la solution
+    au sens des moindres carrés du système linéarisé, dont les colonnes sont
+    préalablement normalisées. Les itérations s'arrêtent lorsque la
+    correction des positions initiales est inférieure à `tol` km.
+
+    Le coefficient de traînée n'est déterminé par les données qu'au-delà de
+    quelques orbites : sur les arcs d'un jour, les valeurs ajustées avec le
+    jeu de forces de référence restent de l'ordre de 2 à 4.
+
+    Paramètres:
+    - iss: données sources (`ISS_Position`).
+    - episode: identifiant de l'épisode de mouvement libre.
+    - build_forceset: fonction `(iss, t0, duration)` construisant le jeu de
+                      forces.
+    - parameters: noms des paramètres des forces ajustés.
+    - max_iter: nombre maximal d'itérations.
+    - tol: seuil de convergence sur la correction des positions (km).
+    - max_duration: durée maximale ajustée en secondes.
+    - solve_kwargs: paramètres supplémentaires de `solve_variational`.
+
+    Retourne un dictionnaire des coordonnées initiales et paramètres
+    ajustés, de la matrice de covariance formelle (normalisée par la
+    variance des résidus), des résidus de position finaux (km) et de
+    statistiques de l'ajustement.
+    """
+    start = time.perf_counter()
+    # Données de l'épisode
+    arc = iss.get_data().query('thrust_episode == @episode')
+    t0 = arc.iloc[0]['datetime']
+    # Dates des données en secondes depuis le début de l'arc
+    t_eval = (arc['datetime'] - t0).dt.total_seconds().to_numpy()
+    if max_duration is not None:
+        t_eval = t_eval[t_eval <= max_duration]
+    source = arc[COLUMNS].to_numpy(dtype=np.float64)[:len(t_eval)].T
+    forceset = build_forceset(iss, t0, t_eval[-1])
+    forces = [forceset.parameter_force(p) for p in parameters]
+    # Coordonnées initiales et paramètres, point de départ de l'ajustement
+    coords = source[:, 0].copy()
+    values = np.array([getattr(f, p) for f, p in zip(forces, parameters)],
+                      dtype=np.float64)
+    nfev, converged = 0, False
+    for iteration in range(1, max_iter + 1):
+        _, v, phi = forceset.solve_variational(t_eval, coords, parameters,
+                                               **solve_kwargs)
+        nfev += forceset.stats['nfev']
+        # Résidus de position et dérivées, empilés par date
+        residuals = (source[:3] - v[:3]).T.ravel()
+        design = phi[:3].transpose(2, 0, 1).reshape(-1, phi.shape[1])
+        # Correction par moindres carrés sur les colonnes normalisées
+        scale = np.linalg.norm(design, axis=0)
+        scale[scale == 0] = 1
+        step = np.linalg.lstsq(design / scale, residuals, rcond=None)[0]
+        step /= scale
+        coords += step[:6]
+        values += step[6:]
+        for force, parameter, value in zip(forces, parameters, values):
+            setattr(force, parameter, value)
+        if np.linalg.norm(step[:3]) < tol:
+            converged = True
+            break
+    # Résidus et dérivées aux valeurs ajustées
+    _, v, phi = forceset.solve_variational(t_eval, coords, parameters,
+                                           **solve_kwargs)
+    nfev += forceset.stats['nfev']
+    residuals = np.linalg.norm(v[:3] - source[:3], axis=0)
+    design = phi[:3].transpose(2, 0, 1).reshape(-1, phi.shape[1])
+    dof = max(design.shape[0] - design.shape[1], 1)
+    variance = np.sum((v[:3] - source[:3])**2) / dof
+    return {
+        'episode': episode, 'start': t0, 'duration': t_eval[-1],
+        'points': len(t_eval), 'coords': coords,
+        'parameters': dict(zip(parameters, values)),
+        'covariance': variance * np.linalg.pinv(design.T @ design),
+        'residuals': residuals,
+        'rms': np.sqrt(np.mean(residuals**2)), 'max': residuals.max(),
+        'iterations': iteration, 'converged': converged, 'nfev': nfev,
+        'wall_time': time.perf_counter() - start,
+    }
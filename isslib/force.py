@@ -2,19 +2,73 @@
 isslib.force
 ============
 
-Fournit la classe abstraite de modélisation des forces
-et la classe de jeu de forces.
+Fournit la classe abstraite de modélisation des forces, la classe de jeu de
+forces et les forces perturbatrices usuelles.
 """
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import sys
-
+import time
 
 import numpy as np
 
+from isslib.profiling import DERIVATIVE, EPHEMERIS, FRAME
+
+try:
+    import numba
+except ImportError:
+    # Dépendance optionnelle : les noyaux compilés se replient sur NumPy
+    numba = None
+
+
+def _time(t0):
+    """Date de référence `t0` au format `astropy.time.Time` (par défaut,
+    maintenant).
+
+    Import différé : pandas et astropy ne sont chargés qu'à l'instanciation
+    des forces datées, et non à l'import du jeu de forces.
+    """
+    import pandas as pd
+    from astropy.time import Time
+    return Time(pd.Timestamp.now() if t0 is None else t0)
+
+
+@lru_cache(maxsize=None)
+def _jit(function):
+    """Compilation Numba, une seule fois par fonction, d'un noyau de calcul."""
+    return numba.njit(cache=True)(function)
+
+
+@lru_cache(maxsize=None)
+def _adams_coefficients(order):
+    """Coefficients d'Adams-Bashforth et d'Adams-Moulton d'ordre `order`.
+
+    Retourne les tableaux `(beta, alpha)` de `order` coefficients : `beta[j]`
+    pondère la dérivée `f[n-j]` dans le prédicteur explicite, et `alpha[j]`
+    la dérivée `f[n+1-j]` dans le correcteur implicite.
+    """
+    def weights(nodes):
+        """Intégrales sur [0, 1] des polynômes de Lagrange aux `nodes`."""
+        result = np.empty(len(nodes))
+        for j, node in enumerate(nodes):
+            others = np.delete(nodes, j)
+            lagrange = (np.polynomial.Polynomial.fromroots(others)
+                        / np.prod(node - others)).integ()
+            result[j] = lagrange(1) - lagrange(0)
+        return result
+    # Noeuds en unités de pas, relatifs au temps t[n]
+    nodes = -np.arange(order, dtype=np.float64)
+    return weights(nodes), weights(nodes + 1)
+
 
 class Force(ABC):
     """Classe abstraite de modélisation d'une force."""
 
+    # Les forces dont `acceleration` accepte les tableaux groupés `(6, N)`
+    # le déclarent ; les autres ne reçoivent que des vecteurs de dimension 6,
+    # trajectoire par trajectoire
+    batched = False
+
     # Le décorateur property permet de définir une propriété en lecture-seule.
     @property
     def G(self):
@@ -45,15 +99,119 @@ class Force(ABC):
 
     @abstractmethod
     def acceleration(self, u, t):
-        """Accélération de la force appliquée au vecteur spécifié."""
+        """Accélération de la force appliquée au vecteur spécifié.
+
+        Le vecteur `u` est de dimension 6, ou un tableau `(6, N)` en mode
+        groupé ; l'accélération retournée est alors de dimensions `(3, N)`.
+        """
         raise NotImplementedError(self.acceleration)
 
+    def accelerations(self, u, t):
+        """Accélération de la force, en mode simple ou groupé.
+
+        Equivalente à `acceleration`, y compris pour les tableaux `(6, N)`
+        lorsque la force ne gère pas le mode groupé (`batched` faux) : elle
+        est alors évaluée trajectoire par trajectoire.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        if self.batched or u.ndim == 1:
+            return self.acceleration(u, t)
+        u2 = u.reshape(6, -1)
+        result = np.empty((3, u2.shape[1]))
+        for n in range(u2.shape[1]):
+            result[:, n] = self.acceleration(u2[:, n], t)
+        return result.reshape((3,) + u.shape[1:])
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul de l'accélération, utilisé par `ForceSet.compile`.
+
+        Retourne une fonction `kernel(u, t, acc)` ajoutant l'accélération de
+        la force aux coordonnées groupées `u` (tableau `(6, N)`) au tableau
+        `acc` de dimensions `(3, N)`. Les forces redéfinissent cette méthode
+        pour résoudre une fois pour toutes leurs constantes et paramètres ;
+        l'implémentation par défaut se contente d'appeler `acceleration`,
+        avec des vecteurs de dimension 6 si la force ne gère pas le mode
+        groupé (`batched`).
+
+        Paramètres:
+        - backend: 'numpy', ou 'numba' pour un noyau compilé lorsque la
+                   force en propose un.
+        - profiler: `isslib.profiling.Profiler` éventuel, pour chronométrer
+                    séparément les calculs auxiliaires de la force
+                    (changements de repère, éphémérides).
+        """
+        acceleration = self.acceleration
+        if self.batched:
+            def kernel(u, t, acc):
+                """Ajout de l'accélération de la force à `acc`."""
+                acc += acceleration(u, t)
+            return kernel
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`, trajectoire par
+            trajectoire."""
+            for n in range(u.shape[1]):
+                acc[:, n] += acceleration(u[:, n], t)
+        return kernel
+
+    @property
+    def parameters(self):
+        """Noms des attributs de la force ajustables aux données."""
+        return ()
+
+    def jacobian(self, u, t):
+        """Dérivées partielles de l'accélération par rapport à `u`.
+
+        Retourne un tableau `(3, 6)` (ou `(3, 6, N)` en mode groupé) dont
+        l'élément `[i, j]` est la dérivée de la composante `i` de
+        l'accélération par rapport à la coordonnée `j`. L'implémentation par
+        défaut procède par différences finies centrées, les douze positions
+        décalées de chaque trajectoire étant évaluées en un seul appel groupé
+        à `acceleration` ; les forces la redéfinissent lorsqu'une expression
+        analytique est disponible.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        u2 = u.reshape(6, -1)
+        # Décalages en position (km) et en vitesse (km/s)
+        steps = np.array([1e-3] * 3 + [1e-6] * 3)
+        shifted = np.repeat(u2[:, np.newaxis], 12, axis=1)
+        for j in range(6):
+            shifted[j, 2*j] += steps[j]
+            shifted[j, 2*j + 1] -= steps[j]
+        a = self.accelerations(shifted.reshape(6, -1), t)
+        a = a.reshape(3, 6, 2, -1)
+        jacobian = (a[:, :, 0] - a[:, :, 1]) / (2 * steps[:, np.newaxis])
+        return jacobian.reshape((3, 6) + u.shape[1:])
+
+    def partials(self, u, t, parameters):
+        """Dérivées partielles de l'accélération par rapport aux paramètres.
+
+        Retourne un tableau `(3, P)` (ou `(3, P, N)` en mode groupé) pour les
+        `P` noms d'attributs `parameters` de la force. L'implémentation par
+        défaut procède par différences finies centrées, en modifiant
+        temporairement les attributs.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        result = np.empty((3, len(parameters)) + u.shape[1:])
+        for k, parameter in enumerate(parameters):
+            value = getattr(self, parameter)
+            step = 1e-6 * abs(value) or 1e-9
+            try:
+                setattr(self, parameter, value + step)
+                a = self.accelerations(u, t)
+                setattr(self, parameter, value - step)
+                a -= self.accelerations(u, t)
+            finally:
+                setattr(self, parameter, value)
+            result[:, k] = a / (2 * step)
+        return result
+
     def acc_norm(self, u, t=0):
         """Norme de l'accélération appliquée au vecteur spécifié."""
         # Application de l'accélération au vecteur
         a = self.acceleration(u, t)
-        # Retourne la norme du vecteur
-        return np.linalg.norm(a)
+        # Retourne la norme du vecteur (ou de chaque vecteur en mode groupé)
+        return np.linalg.norm(a, axis=0)
 
     def __repr__(self):
         """Représentation de la force sous forme de string."""
@@ -66,25 +224,125 @@ class Force(ABC):
 
 class ForceSet():
     """Classe de jeu de forces à appliquer à une particule."""
+    # Méthodes de Runge-Kutta emboîtées à pas adaptatif disponibles, par nom
+    # de classe de `scipy.integrate` (importé à la première utilisation)
+    adaptive_methods = {
+        'RK45': 'RK45',  # Dormand-Prince 5(4)
+        'DOP853': 'DOP853',  # Dormand-Prince 8(5,3)
+    }
+    # Méthodes à pas fixe disponibles, et ordre des méthodes multipas
+    # d'Adams-Bashforth-Moulton
+    fixed_step_methods = {'RK4': None, 'ABM4': 4, 'ABM6': 6, 'ABM8': 8}
+
     def __init__(self, forces):
         """Instancie la classe à partir d'une liste de forces."""
         self.forces = forces
+        # Statistiques de la dernière résolution
+        self.stats = {}
+        # Profileur éventuel (`isslib.profiling.Profiler`), pris en compte
+        # à la compilation de la dérivée
+        self.profiler = None
 
     def derivee(self, u, t):
         """Calcule la dérivée à partir d'un vecteur de coordonnées.
 
         Dans un repère cartésien tridimensionnel, le vecteur de
-        coordonnées est `[x, y, z, dx, dy, dz]`.
+        coordonnées est `[x, y, z, dx, dy, dz]`. En mode groupé, `u` est un
+        tableau `(6, N)` dont chaque colonne est le vecteur de coordonnées
+        d'une trajectoire.
         """
-        # Vecteur des coordonnées sources
-        x, y, z, vx, vy, vz = u
+        # Vecteur (ou tableau de vecteurs) des coordonnées sources
+        u = np.asarray(u)
         # Les vitesses sont les dérivées des positions
-        dx, dy, dz = vx, vy, vz
+        dr = u[3:]
         # Les acclélérations sont définies par les EDO de chaque force
-        dvx, dvy, dvz = np.sum([force.acceleration(u, t)
-                                for force in self.forces], axis=0)
+        dv = np.sum([force.accelerations(u, t) for force in self.forces],
+                    axis=0)
         # Retourne les dérivées
-        return np.array([dx, dy, dz, dvx, dvy, dvz])
+        return np.concatenate([dr, dv])
+
+    def compile(self, shape=(6,), backend='auto'):
+        """Dérivée fusionnée du jeu de forces pour des coordonnées `shape`.
+
+        Les constantes et paramètres de chaque force sont résolus une fois
+        pour toutes (voir `Force.compile`) et les accélérations sont cumulées
+        directement dans le tableau de sortie, sans liste intermédiaire ni
+        concaténation. Retourne une fonction `derivative(u, t, out=None)`
+        équivalente à `derivee`, écrivant le résultat dans le tableau
+        contigu `out` s'il est fourni (un nouveau tableau sinon).
+
+        Paramètres:
+        - shape: dimensions des coordonnées, `(6,)` ou groupées `(6, N)`.
+        - backend: 'numpy', 'numba' (noyaux compilés, nécessite le package
+                   optionnel `numba`), ou 'auto' pour 'numba' s'il est
+                   disponible et 'numpy' sinon.
+        """
+        if backend == 'auto':
+            backend = 'numpy' if numba is None else 'numba'
+        if backend not in ('numpy', 'numba'):
+            raise ValueError("backend should be one of auto, numpy, numba.")
+        if backend == 'numba' and numba is None:
+            raise ImportError("the 'numba' backend requires numba.")
+        profiler = self.profiler
+        kernels = [force.compile(backend, profiler) for force in self.forces]
+        # Chronométrage de chaque force si le profilage est actif
+        if profiler is not None:
+            kernels = [profiler.timed(str(force), kernel)
+                       for force, kernel in zip(self.forces, kernels)]
+        shape = tuple(shape)
+        # Nombre de trajectoires (1 en mode simple)
+        size = int(np.prod(shape[1:]))
+
+        def derivative(u, t, out=None):
+            """Dérivée des coordonnées `u` au temps `t`."""
+            if out is None:
+                out = np.empty(shape)
+            # Vues groupées (6, N) des coordonnées et de la sortie
+            u2, out2 = u.reshape(6, size), out.reshape(6, size)
+            # Les vitesses sont les dérivées des positions
+            out2[:3] = u2[3:]
+            # Cumul des accélérations de chaque force
+            acc = out2[3:]
+            acc.fill(0)
+            for kernel in kernels:
+                kernel(u2, t, acc)
+            return out
+        if profiler is not None:
+            return profiler.timed(DERIVATIVE, derivative, 'total')
+        return derivative
+
+    def jacobian(self, u, t):
+        """Matrice jacobienne `(6, 6)` de la dérivée par rapport à `u`.
+
+        En mode groupé, le tableau retourné est de dimensions `(6, 6, N)`.
+        Les dérivées partielles des accélérations sont celles de
+        `Force.jacobian`.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        jacobian = np.zeros((6, 6) + u.shape[1:])
+        # Les vitesses sont les dérivées des positions
+        for i in range(3):
+            jacobian[i, i + 3] = 1
+        for force in self.forces:
+            jacobian[3:] += force.jacobian(u, t)
+        return jacobian
+
+    def parameter_force(self, parameter):
+        """Force du jeu dont l'attribut `parameter` est ajustable."""
+        for force in self.forces:
+            if parameter in force.parameters:
+                return force
+        raise ValueError(f"no force with parameter '{parameter}'.")
+
+    def partials(self, u, t, parameters):
+        """Dérivées partielles `(3, P)` des accélérations par rapport aux
+        paramètres `parameters` (voir `Force.partials`)."""
+        u = np.asarray(u, dtype=np.float64)
+        result = np.empty((3, len(parameters)) + u.shape[1:])
+        for k, parameter in enumerate(parameters):
+            force = self.parameter_force(parameter)
+            result[:, k] = force.partials(u, t, [parameter])[:, 0]
+        return result
 
     def magnitude(self, u):
         """Calcul des ordres de grandeur des forces à des coordonnées."""
@@ -92,8 +350,73 @@ class ForceSet():
         return {str(force): np.log10(force.acc_norm(u))
                 for force in self.forces}
 
-    def solve(self, t_start, t_stop, t_step, coords, interrupt=None):
-        """Résolution d'équation différentielle par la méthode de Runge-Kutta.
+    @staticmethod
+    def batch(coords):
+        """Coordonnées initiales au format `(6,)` ou groupé `(6, N)`.
+
+        Les coordonnées groupées fournies au format `(N, 6)` sont transposées
+        (un tableau `(6, 6)` est toujours lu au format `(6, N)`).
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        if coords.ndim == 2 and coords.shape[0] != 6 and coords.shape[1] == 6:
+            return coords.T
+        return coords
+
+    def __interrupt(self, interrupt, v, k, t, stopped):
+        """Détection des trajectoires interrompues au temps d'indice `k`.
+
+        Les trajectoires précédemment interrompues (tableau booléen `stopped`,
+        mis à jour sur place) sont remplacées par des `nan`. Retourne vrai
+        lorsque toutes les trajectoires sont interrompues.
+        """
+        # Vue groupée (6, N, points) de la solution, avec N=1 en mode simple
+        w = v.reshape(v.shape[0], -1, v.shape[-1])
+        # Les trajectoires déjà interrompues ne sont plus calculées
+        w[:, stopped, k] = np.nan
+        # Trajectoires nouvellement interrompues
+        new = np.atleast_1d(interrupt(v[..., k])) & ~stopped
+        for n in np.flatnonzero(new):
+            label = f" {n}" if v.ndim > 2 else ""
+            print(f"Interruption du calcul de solution{label} à t={t[k]}!",
+                  file=sys.stderr)
+            if self.profiler is not None:
+                self.profiler.emit('interrupt', trajectory=int(n),
+                                   t=float(t[k]))
+        stopped |= new
+        return np.all(stopped)
+
+    def __adaptive_solver(self, method):
+        """Classe d'intégrateur `scipy.integrate` de la méthode `method`."""
+        if method not in self.adaptive_methods:
+            raise ValueError("method should be one of "
+                             f"{', '.join(self.adaptive_methods)}.")
+        from scipy import integrate
+        return getattr(integrate, self.adaptive_methods[method])
+
+    def __end_run(self):
+        """Transmission des statistiques d'une résolution au profileur."""
+        if self.profiler is not None:
+            self.profiler.add_run(self.stats)
+            self.profiler.emit('end', run=dict(self.stats))
+
+    def solve(self, t_start, t_stop, t_step, coords, interrupt=None,
+              backend='auto', method='RK4'):
+        """Résolution d'équation différentielle à pas fixe.
+
+        La méthode par défaut est celle de Runge-Kutta d'ordre 4, à quatre
+        évaluations de la dérivée par pas. Les méthodes multipas
+        d'Adams-Bashforth-Moulton ('ABM4', 'ABM6', 'ABM8', de l'ordre
+        indiqué) réutilisent les dérivées des pas précédents et n'évaluent
+        la dérivée que deux fois par pas (prédiction, évaluation, correction,
+        évaluation) ; leurs premiers pas sont calculés par Runge-Kutta. La
+        grille temporelle et l'interruption sont identiques quelle que soit
+        la méthode.
+
+        Les coordonnées initiales peuvent être groupées en un tableau
+        `(6, N)` (ou `(N, 6)`) pour propager `N` trajectoires simultanément :
+        chaque étape de calcul traite alors toutes les trajectoires en un seul
+        appel aux forces, et le tableau solution est de dimensions
+        `(6, N, num_points)`.
 
         Attributs:
             t_start:   valeur de départ de la variable temporelle
@@ -102,31 +425,936 @@ class ForceSet():
             coords:    coordonnées initiales
             interrupt: fonction pour interrompre prématurément le calcul (par
                        exemple, pour éviter des calculs inutiles une fois les
-                       données hors-limites)
+                       données hors-limites). En mode groupé, elle retourne
+                       un tableau de `N` booléens et seules les trajectoires
+                       concernées sont interrompues.
+            backend:   moteur de calcul de la dérivée (voir `compile`)
+            method:    méthode d'intégration, 'RK4', 'ABM4', 'ABM6' ou 'ABM8'
          """
         # Création du tableau temps
         num_points = int((t_stop - t_start) / t_step) + 1
         t = np.linspace(t_start, t_stop, num_points)
+        # Coordonnées initiales, éventuellement groupées
+        coords = self.batch(coords)
+        # Initialisation du tableau solution (les points non calculés après
+        # interruption de toutes les trajectoires restent à `nan`)
+        v = np.full(coords.shape + (num_points,), np.nan)
+        # Assemblage des blocs successifs de la solution
+        k = 0
+        for _, chunk in self.stream(t_start, t_stop, t_step, coords,
+                                    interrupt=interrupt, backend=backend,
+                                    method=method):
+            v[..., k:k + chunk.shape[-1]] = chunk
+            k += chunk.shape[-1]
+        # Retourne des tableaux des temps et des solutions
+        return t, v
+
+    @staticmethod
+    def __rk4_step(derivative, y, t, h, w, d1, d2, d3, d4):
+        """Pas de Runge-Kutta d'ordre 4, mettant à jour `y` sur place.
+
+        Les tableaux de travail `w` et `d1` à `d4`, de mêmes dimensions que
+        `y`, sont réutilisés d'un pas à l'autre.
+        """
+        derivative(y, t, d1)
+        np.multiply(d1, h / 2, out=w)
+        derivative(np.add(w, y, out=w), t + h / 2, d2)
+        np.multiply(d2, h / 2, out=w)
+        derivative(np.add(w, y, out=w), t + h / 2, d3)
+        np.multiply(d3, h, out=w)
+        derivative(np.add(w, y, out=w), t + h, d4)
+        # y += h / 6 * (d1 + 2*d2 + 2*d3 + d4), calculé sur place
+        d2 += d3
+        d2 *= 2
+        d2 += d1
+        d2 += d4
+        d2 *= h / 6
+        y += d2
+
+    def __stepper(self, method, derivative, shape, h):
+        """Fonction de pas `step(y, t)` de la méthode à pas fixe `method`.
+
+        La fonction retournée avance sur place les coordonnées `y` du temps
+        `t` au temps `t + h` et retourne le nombre d'évaluations de la
+        dérivée réalisées. Pour les méthodes multipas, elle conserve
+        l'historique des dérivées des pas successifs : une nouvelle fonction
+        doit être créée pour chaque résolution.
+        """
+        if method not in self.fixed_step_methods:
+            raise ValueError("method should be one of "
+                             f"{', '.join(self.fixed_step_methods)}.")
+        # Tableaux de travail, alloués une seule fois
+        w = np.empty(shape)
+        scratch = np.empty((4,) + shape)
+
+        def rk4(y, t):
+            """Pas de Runge-Kutta d'ordre 4."""
+            self.__rk4_step(derivative, y, t, h, w, *scratch)
+            return 4
+        order = self.fixed_step_methods[method]
+        if order is None:
+            return rk4
+        # Historique circulaire des dérivées, `history[p]` étant la dérivée
+        # au dernier point calculé, et coefficients permutés en conséquence
+        # pour chaque position `p` (le plus ancien point n'intervient pas
+        # dans le correcteur)
+        beta, alpha = _adams_coefficients(order)
+        lags = (np.arange(order)[:, np.newaxis]
+                - np.arange(order)[np.newaxis, :]) % order
+        predictor = beta[lags]
+        corrector = np.append(alpha[1:], 0)[lags]
+        history = np.empty((order,) + shape)
+        flat, w_flat = history.reshape(order, -1), w.reshape(-1)
+        f = np.empty(shape)
+        # Position courante dans l'historique et nombre de dérivées connues
+        p, known = 0, 0
+
+        def abm(y, t):
+            """Pas prédicteur-correcteur d'Adams-Bashforth-Moulton."""
+            nonlocal p, known
+            nfev = 0
+            if known == 0:
+                derivative(y, t, history[p])
+                nfev, known = 1, 1
+            if known < order:
+                # Démarrage par Runge-Kutta
+                nfev += rk4(y, t)
+            else:
+                # Prédiction par Adams-Bashforth et évaluation
+                np.dot(predictor[p], flat, out=w_flat)
+                np.multiply(w, h, out=w)
+                derivative(np.add(w, y, out=w), t + h, f)
+                # Correction par Adams-Moulton
+                np.dot(corrector[p], flat, out=w_flat)
+                np.multiply(f, alpha[0], out=f)
+                np.multiply(np.add(w, f, out=w), h, out=w)
+                y += w
+                nfev += 1
+            # Evaluation au nouveau point, ajoutée à l'historique
+            p = (p + 1) % order
+            derivative(y, t + h, history[p])
+            known = min(known + 1, order)
+            return nfev + 1
+        return abm
+
+    def stream(self, t_start, t_stop, t_step, coords, chunk_size=1024,
+               interrupt=None, backend='auto', start=0, method='RK4'):
+        """Résolution à pas fixe, produite par blocs.
+
+        Générateur équivalent à `solve`, produisant au fur et à mesure du
+        calcul des couples `(t, v)` d'au plus `chunk_size` points, où `v` est
+        de dimensions `coords.shape + (n,)` : la mémoire utilisée est bornée
+        quelle que soit la durée propagée. Lorsque toutes les trajectoires
+        sont interrompues, le dernier bloc est tronqué et le générateur
+        s'arrête.
+
+        Attributs:
+            t_start, t_stop, t_step, coords, interrupt, backend, method:
+                       voir `solve`
+            chunk_size: nombre maximal de points par bloc
+            start:     indice dans la grille temporelle des coordonnées
+                       `coords`, pour reprendre un calcul interrompu (les
+                       trajectoires dont les coordonnées sont `nan` sont
+                       considérées comme interrompues ; les méthodes
+                       multipas redémarrent alors par Runge-Kutta)
+        """
+        # Grille temporelle, identique à celle de `solve`
+        num_points = int((t_stop - t_start) / t_step) + 1
+        grid_step = (t_stop - t_start) / max(num_points - 1, 1)
+        # Coordonnées initiales, éventuellement groupées
+        coords = self.batch(coords)
+        # Dérivée fusionnée, état courant contigu et fonction de pas
+        derivative = self.compile(coords.shape, backend)
+        y = np.array(coords, order='C')
+        step = self.__stepper(method, derivative, coords.shape, t_step)
+        # Trajectoires interrompues, nombres de pas réalisés et
+        # d'évaluations, et durée de calcul (hors traitements des blocs par
+        # l'appelant)
+        stopped = np.isnan(y.reshape(6, -1)[0])
+        nsteps, nfev, wall_time, clock = 0, 0, 0.0, time.perf_counter()
+        for first in range(start, num_points, chunk_size):
+            # Temps et solutions du bloc
+            n = min(chunk_size, num_points - first)
+            t = t_start + np.arange(first, first + n) * grid_step
+            if first + n == num_points:
+                t[-1] = t_stop
+            v = np.empty(coords.shape + (n,))
+            for k in range(n):
+                i = first + k
+                # Pas depuis le point précédent (sauf au point de départ)
+                if i > start:
+                    nfev += step(y, t_start + (i-1) * grid_step)
+                    nsteps += 1
+                v[..., k] = y
+                if interrupt and i > start:
+                    if self.__interrupt(interrupt, v, k, t, stopped):
+                        n = k + 1
+                        t, v = t[:n], v[..., :n]
+                        break
+                    # Report des trajectoires interrompues dans l'état courant
+                    y[...] = v[..., k]
+            # Statistiques de résolution
+            wall_time += time.perf_counter() - clock
+            self.stats = {'method': method, 'nsteps': nsteps,
+                          'nfev': nfev, 'nrejected': 0,
+                          'wall_time': wall_time}
+            if self.profiler is not None:
+                self.profiler.emit('chunk', progress=(first + n) / num_points,
+                                   run=dict(self.stats))
+            yield t, v
+            clock = time.perf_counter()
+            # Arrêt après interruption de toutes les trajectoires
+            if np.all(stopped):
+                break
+        self.__end_run()
+
+    def solve_to_store(self, store, coords, chunk_size=1024, interrupt=None,
+                       backend='auto', method='RK4'):
+        """Résolution par blocs enregistrés au fur et à mesure sur disque.
+
+        La grille temporelle est celle du stockage `store` (voir
+        `isslib.store.PropagationStore`). Chaque bloc calculé est écrit puis
+        validé par un point de reprise : si le stockage contient déjà des
+        résultats (calcul précédemment interrompu), la résolution reprend
+        depuis le dernier point enregistré et `coords` est ignoré. Retourne
+        le stockage.
+        """
+        if store.finished:
+            return store
+        # Reprise depuis le dernier point enregistré, déjà stocké
+        resume = store.count > 0
+        start = store.count - 1 if resume else 0
+        if resume:
+            coords = store.states[start]
+        for t, v in self.stream(store.t_start, store.t_stop, store.t_step,
+                                coords, chunk_size, interrupt, backend,
+                                start, method):
+            if resume:
+                t, v, resume = t[1:], v[..., 1:], False
+            store.append(t, v)
+        store.finish()
+        return store
+
+    def solve_adaptive(self, t_eval, coords, method='DOP853', rtol=1e-9,
+                       atol=1e-6, interrupt=None, backend='auto'):
+        """Résolution d'équation différentielle à pas adaptatif.
+
+        L'intégration utilise une méthode de Runge-Kutta emboîtée, dont le
+        pas est ajusté pour respecter les tolérances d'erreur. Les solutions
+        sont échantillonnées aux temps demandés par sortie dense, sans
+        contraindre le pas d'intégration. Les nombres de pas et d'évaluations
+        de la dérivée sont enregistrés dans l'attribut `stats`. Les
+        coordonnées groupées sont traitées comme dans `solve`, avec un pas
+        commun à toutes les trajectoires.
+
+        Attributs:
+            t_eval:    tableau croissant des temps de sortie, le premier
+                       étant le temps des coordonnées initiales (par exemple,
+                       les dates des données sources en secondes)
+            coords:    coordonnées initiales
+            method:    méthode d'intégration, 'RK45' (Dormand-Prince 5(4))
+                       ou 'DOP853' (Dormand-Prince 8(5,3))
+            rtol:      tolérance relative sur l'erreur locale
+            atol:      tolérance absolue sur l'erreur locale (km et km/s)
+            interrupt: fonction pour interrompre prématurément le calcul,
+                       évaluée à chaque temps de sortie
+            backend:   moteur de calcul de la dérivée (voir `compile`)
+        """
+        solver_class = self.__adaptive_solver(method)
+        # Tableau des temps de sortie
+        t = np.asarray(t_eval, dtype=np.float64)
+        # Coordonnées initiales, éventuellement groupées
+        coords = self.batch(coords)
         # Initialisation du tableau solution
-        v = np.empty((len(coords), num_points))
+        v = np.empty(coords.shape + (len(t),))
         # Condition initiale
-        v[:, 0] = coords
-        # Boucle for des variables de la méthode
-        for i in range(num_points - 1):
-            d1 = self.derivee(v[:, i], t[i])
-            d2 = self.derivee(v[:, i] + t_step / 2 * d1, t[i] + t_step / 2)
-            d3 = self.derivee(v[:, i] + t_step / 2 * d2, t[i] + t_step / 2)
-            d4 = self.derivee(v[:, i] + t_step * d3,  t[i] + t_step)
-            v[:, i + 1] = v[:, i] + t_step / 6 * (d1 + 2*d2 + 2*d3 + d4)
-            if interrupt and interrupt(v[:, i+1]):
-                t_inter = t_start + i*t_step
-                print(f"Interruption du calcul de solution à t={t_inter}!",
-                      file=sys.stderr)
-                v[:, i+2:] = np.nan
-                break
+        v[..., 0] = coords
+        # Intégrateur à pas adaptatif sur l'intervalle des temps de sortie,
+        # opérant sur les coordonnées mises à plat (scipy conservant les
+        # dérivées calculées, chaque appel produit un nouveau tableau)
+        derivative = self.compile(coords.shape, backend)
+        solver = solver_class(
+            lambda t, u: derivative(u, t).ravel(),
+            t[0], coords.ravel(), t[-1], rtol=rtol, atol=atol)
+        # Trajectoires interrompues
+        stopped = np.zeros(coords.shape[1:] or 1, dtype=bool)
+        # Indice du prochain temps de sortie, nombres de pas réalisés et
+        # rejetés, et durée de calcul
+        i, nsteps, nrejected = 1, 0, 0
+        clock = time.perf_counter()
+        while i < len(t):
+            # Un pas rejeté coûte `n_stages` évaluations supplémentaires
+            nfev = solver.nfev
+            solver.step()
+            if solver.status == 'failed':
+                raise RuntimeError(f"integration failed at t={solver.t}.")
+            nsteps += 1
+            nrejected += (solver.nfev - nfev) // solver.n_stages - 1
+            # Temps de sortie couverts par le dernier pas
+            j = np.searchsorted(t, solver.t, side='right')
+            if j == i:
+                continue
+            # Echantillonnage des solutions par sortie dense
+            v[..., i:j] = solver.dense_output()(t[i:j]).reshape(
+                coords.shape + (j - i,))
+            # Interruption au premier temps de sortie concerné
+            if interrupt:
+                stop = next((k for k in range(i, j) if self.__interrupt(
+                    interrupt, v, k, t, stopped)), None)
+                if stop is not None:
+                    v[..., stop+1:] = np.nan
+                    break
+            i = j
+        # Statistiques de résolution
+        self.stats = {'method': method, 'nsteps': nsteps,
+                      'nfev': solver.nfev, 'nrejected': nrejected,
+                      'wall_time': time.perf_counter() - clock}
+        self.__end_run()
         # Retourne des tableaux des temps et des solutions
         return t, v
 
+    def solve_variational(self, t_eval, coords, parameters=(),
+                          method='DOP853', rtol=1e-9, atol=1e-9,
+                          backend='auto'):
+        """Résolution des équations variationnelles avec l'état.
+
+        La matrice de transition `Phi = du/du0` et les sensibilités
+        `S = du/dp` aux paramètres `parameters` (voir `Force.parameters`,
+        par exemple 'drag_coeff') sont propagées avec l'état par
+        `dPhi/dt = A Phi` et `dS/dt = A S + df/dp`, où `A` est la jacobienne
+        de la dérivée (voir `jacobian`). Une seule propagation fournit ainsi
+        les dérivées des solutions par rapport aux coordonnées initiales et
+        aux paramètres, sans différences finies sur `solve`.
+
+        Attributs:
+            t_eval, method, rtol, atol, backend:
+                       voir `solve_adaptive` (une seule trajectoire)
+            coords:    coordonnées initiales, de dimension 6
+            parameters: noms des paramètres des forces
+
+        Retourne les tableaux des temps, des solutions `(6, num_points)` et
+        des dérivées `(6, 6 + P, num_points)`, dont les six premières
+        colonnes sont la matrice de transition et les suivantes les
+        sensibilités aux `P` paramètres.
+        """
+        solver_class = self.__adaptive_solver(method)
+        t = np.asarray(t_eval, dtype=np.float64)
+        coords = np.asarray(coords, dtype=np.float64)
+        if coords.shape != (6,):
+            raise ValueError("coords should be a single 6-vector.")
+        parameters = list(parameters)
+        # Vecteur augmenté : état puis matrice (6, 6 + P) des dérivées,
+        # initialement l'identité et des sensibilités nulles
+        size = 6 + len(parameters)
+        y0 = np.concatenate([coords, np.eye(6, size).ravel()])
+        derivative = self.compile((6,), backend)
+
+        def variational(t, y):
+            """Dérivée du vecteur augmenté."""
+            u, phi = y[:6], y[6:].reshape(6, size)
+            dy = np.empty_like(y)
+            derivative(u, t, dy[:6])
+            dphi = self.jacobian(u, t) @ phi
+            if parameters:
+                dphi[3:, 6:] += self.partials(u, t, parameters)
+            dy[6:] = dphi.ravel()
+            return dy
+        solver = solver_class(
+            variational, t[0], y0, t[-1], rtol=rtol, atol=atol)
+        # Initialisation des tableaux solution
+        v = np.empty((6, len(t)))
+        phi = np.empty((6, size, len(t)))
+        v[:, 0], phi[..., 0] = coords, np.eye(6, size)
+        i, nsteps, nrejected = 1, 0, 0
+        clock = time.perf_counter()
+        while i < len(t):
+            nfev = solver.nfev
+            solver.step()
+            if solver.status == 'failed':
+                raise RuntimeError(f"integration failed at t={solver.t}.")
+            nsteps += 1
+            nrejected += (solver.nfev - nfev) // solver.n_stages - 1
+            # Echantillonnage par sortie dense aux temps couverts par le pas
+            j = np.searchsorted(t, solver.t, side='right')
+            if j > i:
+                y = solver.dense_output()(t[i:j])
+                v[:, i:j] = y[:6]
+                phi[..., i:j] = y[6:].reshape(6, size, j - i)
+                i = j
+        # Statistiques de résolution
+        self.stats = {'method': method, 'nsteps': nsteps,
+                      'nfev': solver.nfev, 'nrejected': nrejected,
+                      'wall_time': time.perf_counter() - clock}
+        self.__end_run()
+        return t, v, phi
+
     def __repr__(self):
         """Représentation du jeu de forces sous forme de string."""
         return fr"ForceSet[{', '.join(str(force) for force in self.forces)}]"
+
+
+class EarthGravity(Force):
+    """Force de gravitation terrestre."""
+
+    # Accélération vectorisée sur les trajectoires groupées
+    batched = True
+
+    @property
+    def name(self):
+        """Nom de la force sous forme de string."""
+        return "Force de gravitation terrestre"
+
+    @property
+    def formula(self):
+        """Expression de la force au format LaTeX."""
+        return r"-\frac{GMm}{r^3}\mathbf r"
+
+    def acceleration(self, u, t):
+        """EDO gravitation terrestre."""
+        # vecteur position
+        r = np.array(u[:3])
+        # Expression de l'acceleration résultante de la force
+        return - self.G * self.earth_mass / np.linalg.norm(r, axis=0)**3 * r
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul de la gravitation terrestre."""
+        mu = self.G * self.earth_mass
+        if backend == 'numba':
+            core = _jit(_gravity_core)
+            return lambda u, t, acc: core(u, mu, acc)
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            r = u[:3]
+            r2 = np.einsum('ij,ij->j', r, r)
+            acc -= mu / (r2 * np.sqrt(r2)) * r
+        return kernel
+
+    def jacobian(self, u, t):
+        """Dérivées partielles analytiques de la gravitation terrestre.
+
+        Seules les positions interviennent :
+        `-GM/r³ (I - 3 r rᵀ / r²)`.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        r = u[:3]
+        r2 = np.sum(r * r, axis=0)
+        jacobian = np.zeros((3, 6) + u.shape[1:])
+        jacobian[:, :3] = (- self.G * self.earth_mass / (r2 * np.sqrt(r2))
+                           * (np.eye(3).reshape((3, 3) + (1,) * (r.ndim - 1))
+                              - 3 * r[:, np.newaxis] * r[np.newaxis] / r2))
+        return jacobian
+
+
+class Geopotential(Force):
+    """Force géopotentielle limitée aux termes de degré 2."""
+
+    # Accélération vectorisée sur les trajectoires groupées
+    batched = True
+
+    def __init__(self, t0=None, rotation=None):
+        """Instancie la force à partir d'un temps de référence.
+
+        Paramètres:
+        - t0: date correspondant au temps `t=0` (par défaut, maintenant).
+        - rotation: table de rotation `isslib.coordinates.EarthRotation`
+                    utilisée pour le passage au repère terrestre. A défaut,
+                    la transformation exacte d'astropy est calculée à chaque
+                    appel, au prix d'un coût bien supérieur.
+        """
+        self.t0 = _time(t0)
+        self.rotation = rotation
+
+    @property
+    def C20(self):
+        """Valeur du coefficient de Legendre cosinus de degré 2 d'ordre 0."""
+        return -484.2e-6  # coefficient sans unité
+
+    @property
+    def C22(self):
+        """Valeur du coefficient de Legendre cosinus de degré 2 d'ordre 2."""
+        return 2.439261e-6  # coefficient sans unité
+
+    @property
+    def S22(self):
+        """Valeur du coefficient de Legendre sinus de degré 2 d'ordre 2."""
+        return -1.400266e-6  # coefficient sans unité
+
+    @property
+    def name(self):
+        """Nom de la force sous forme de string."""
+        return "Force géopotentielle"
+
+    @property
+    def formula(self):
+        """Expression de la force au format LaTeX."""
+        return (r"\nabla\frac{GMm}r\left[1+\frac{\sqrt5}2\frac{R^2}{r^2}"
+                r"\Bigg(\bar{C}_{2,0}\left(3\sin^2(\varphi)-1\right)+"
+                r"\sqrt3\cos^2(\varphi)\left(\bar{C}_{2,2}\cos(2\lambda)+"
+                r"\bar{S}_{2,2}\sin(2\lambda)\right)\Bigg)\right]")
+
+    def terrestrial(self, r, t):
+        """Coordonnées terrestres cartésiennes du vecteur `r` au temps `t`."""
+        # Rotation interpolée depuis la table précalculée
+        if self.rotation is not None:
+            return self.rotation.rotate(r, t)
+        # Transformation exacte (et coûteuse) d'astropy
+        import astropy.units as units
+        from isslib.coordinates import celestial2terrestrial
+        return np.array(celestial2terrestrial(*r, self.t0 + t * units.s))
+
+    def acceleration(self, u, t):
+        """EDO géopotentiel."""
+        # vecteur position
+        r = np.array(u[:3])
+        # calcul de la distance au centre de la terre (norme de r),
+        # longitude et latitude terrestre à la date et l'heure donnée
+        x, y, z = self.terrestrial(r, t)
+        n_r = np.linalg.norm(r, axis=0)
+        longitude, latitude = np.arctan2(y, x), np.arcsin(z / n_r)
+        # nabla(GM/r)
+        nablaGMr = - self.G * self.earth_mass / n_r**3 * r
+        # Expression de l'acceleration résultante de la force
+        return nablaGMr * (1 + np.sqrt(5)*self.earth_radius**2/(2*n_r**2)
+                           * (self.C20 * (3 * np.sin(latitude)**2 - 1)
+                              + np.sqrt(3) * np.cos(latitude)**2
+                              * (self.C22 * np.cos(2*longitude)
+                                 + self.S22 * np.sin(2*longitude))))
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul du géopotentiel.
+
+        Les fonctions trigonométriques de la latitude et de la longitude
+        sont exprimées directement à partir des coordonnées terrestres :
+        `sin(lat) = z/r`, `cos²(lat)cos(2lon) = (x²-y²)/r²` et
+        `cos²(lat)sin(2lon) = 2xy/r²`.
+        """
+        mu = self.G * self.earth_mass
+        k = np.sqrt(5) * self.earth_radius**2 / 2
+        c20, c22, s22 = (self.C20, np.sqrt(3) * self.C22,
+                         np.sqrt(3) * self.S22)
+        terrestrial = self.terrestrial
+        if profiler is not None:
+            terrestrial = profiler.timed(FRAME, terrestrial, 'auxiliary')
+        if backend == 'numba':
+            core = _jit(_geopotential_core)
+            return lambda u, t, acc: core(
+                u, np.ascontiguousarray(terrestrial(u[:3], t)),
+                mu, k, c20, c22, s22, acc)
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            r = u[:3]
+            x, y, z = terrestrial(r, t)
+            r2 = x*x + y*y + z*z
+            harmonics = (c20 * (3 * z*z / r2 - 1)
+                         + (c22 * (x*x - y*y) + s22 * 2 * x*y) / r2)
+            acc -= mu / (r2 * np.sqrt(r2)) * (1 + k / r2 * harmonics) * r
+        return kernel
+
+
+class AtmosphericDrag(Force):
+    """Modélisation de la traînée atmosphérique.
+
+    Par défaut, la masse volumique de l'air est constante (`rho`). Un modèle
+    `isslib.atmosphere.DensityModel` la fait varier avec l'altitude et, si
+    la position du Soleil est fournie, avec l'heure solaire locale
+    (renflement diurne de Harris-Priester).
+    """
+
+    # Accélération vectorisée sur les trajectoires groupées
+    batched = True
+
+    def __init__(self, mass, drag_coeff, drag_area, atmosphere=None,
+                 sun=None):
+        """Instanciation avec les caractéristiques de l'objet soumis.
+
+        Paramètres:
+        - mass: masse de l'objet en kg.
+        - drag_coeff: coefficient de traînée, sans unité.
+        - drag_area: surface de traînée en m².
+        - atmosphere: modèle de masse volumique `DensityModel` (par défaut,
+                      masse volumique constante).
+        - sun: corps `CelestialBody` du Soleil, orientant le renflement
+               diurne du modèle (par défaut, masse volumique moyenne).
+        """
+        self.mass = mass
+        self.drag_coeff = drag_coeff
+        self.drag_area = drag_area
+        self.atmosphere = atmosphere
+        self.sun = sun
+        # Apex du renflement diurne aux noeuds horaires déjà calculés
+        self.__apex_nodes = {}
+
+    @property
+    def name(self):
+        """Nom de la force sous forme de string."""
+        return "Traînée atmosphérique"
+
+    @property
+    def formula(self):
+        """Expression de la force au format LaTeX."""
+        return (r"-\frac12C_DA\rho\left(\dot r-\omega r\right)^2\mathbf e_v")
+
+    @property
+    def parameters(self):
+        """Noms des attributs de la force ajustables aux données."""
+        return ('drag_coeff',)
+
+    @property
+    def rho(self):
+        """Approximation de la masse volumique de l'air autour de 420 km."""
+        return 1e-12  # kg.m^-3
+
+    @property
+    def omega(self):
+        """Vecteur vitesse angulaire moyen de la Terre."""
+        return [0, 0, 7.292e-5]  # rad.s^-1
+
+    def apex_at(self, t):
+        """Vecteur unitaire de l'apex du renflement diurne au temps `t`.
+
+        L'apex ne se déplaçant que d'environ 1° par jour, il est calculé
+        aux heures entières, mises en cache, et interpolé linéairement
+        entre elles (écart inférieur à 1e-7 rad) : la position du Soleil
+        n'est pas recalculée à chaque évaluation de la force.
+        """
+        x = t / 3600
+        k = int(np.floor(x))
+        nodes = self.__apex_nodes
+        for j in (k, k + 1):
+            if j not in nodes:
+                nodes[j] = self.atmosphere.apex(
+                    self.sun.position_at(j * 3600.0))
+        return nodes[k] + (x - k) * (nodes[k + 1] - nodes[k])
+
+    def density(self, r, t, derivatives=False):
+        """Masse volumique de l'air en kg/m³ aux positions `r` au temps `t`.
+
+        Si `derivatives` est vrai, retourne également son gradient par
+        rapport à la position, en kg/m³/km (nul pour une masse volumique
+        constante).
+        """
+        if self.atmosphere is None:
+            return (self.rho, 0) if derivatives else self.rho
+        r = np.asarray(r, dtype=np.float64)
+        n_r = np.sqrt(np.sum(r * r, axis=0))
+        e_r = r / n_r
+        apex = cos_psi = None
+        if self.sun is not None:
+            apex = self.apex_at(t).reshape((3,) + (1,) * (r.ndim - 1))
+            cos_psi = np.sum(apex * e_r, axis=0)
+        result = self.atmosphere.density(n_r - self.earth_radius, cos_psi,
+                                         derivatives)
+        if not derivatives:
+            return result
+        rho, d_altitude, d_cos = result
+        # Gradients de l'altitude (e_r) et de cos(psi) ((apex - cos_psi
+        # e_r) / |r|)
+        gradient = d_altitude * e_r
+        if apex is not None:
+            gradient = gradient + d_cos * (apex - cos_psi * e_r) / n_r
+        return rho, gradient
+
+    def acceleration(self, u, t):
+        """EDO traînée atmosphérique."""
+        # vecteurs position et vitesse
+        r, dotr = np.split(np.array(u), 2)
+        # Masse volumique de l'air à la position de la station
+        rho = self.density(r, t)
+        # Vitesse relative à celle de l'atmosphère, en m.s^-1
+        v_r = dotr*1e3 - np.cross(self.omega, r*1e3, axisb=0, axisc=0)
+        # Norme et vecteur unitaire de v_r
+        n_v = np.linalg.norm(v_r, axis=0)
+        e_v = v_r / n_v
+        # Expression de l'acceleration résultante de la force, en km.s^-2
+        return (-1/2 * self.drag_coeff * self.drag_area/self.mass
+                * rho * n_v**2 * e_v) * 1e-3
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul de la traînée atmosphérique.
+
+        Les vitesses restent en km/s : le facteur 1e3 des conversions en
+        m/s (au carré) et retour en km/s² est intégré au coefficient. Avec
+        un modèle de masse volumique, ses tables précalculées sont lues
+        directement par le noyau, et l'apex du renflement diurne (voir
+        `apex_at`) n'est évalué qu'une fois par appel pour toutes les
+        trajectoires.
+        """
+        if self.atmosphere is not None:
+            return self.__compile_atmosphere(backend, profiler)
+        c = (0.5 * self.drag_coeff * self.drag_area / self.mass * self.rho
+             * 1e3)
+        w = self.omega[2]
+        if backend == 'numba':
+            core = _jit(_drag_core)
+            return lambda u, t, acc: core(u, c, w, acc)
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            # Vitesse relative à l'atmosphère : v - omega x r
+            v = u[3:].copy()
+            v[0] += w * u[1]
+            v[1] -= w * u[0]
+            acc -= c * np.sqrt(np.einsum('ij,ij->j', v, v)) * v
+        return kernel
+
+    def __compile_atmosphere(self, backend, profiler):
+        """Noyau de calcul avec modèle de masse volumique."""
+        c = 0.5 * self.drag_coeff * self.drag_area / self.mass * 1e3
+        w = self.omega[2]
+        model, radius = self.atmosphere, self.earth_radius
+        apex_at = None if self.sun is None else self.apex_at
+        if apex_at is not None and profiler is not None:
+            apex_at = profiler.timed(EPHEMERIS, apex_at, 'auxiliary')
+        if backend == 'numba':
+            core = _jit(_atmosphere_drag_core)
+            params = (c, w, radius, model.h0, model.inv_step, model.logs,
+                      model.exponent / 2)
+            if apex_at is None:
+                no_apex = np.zeros(3)
+                return lambda u, t, acc: core(u, *params, no_apex, False, acc)
+            return lambda u, t, acc: core(u, *params, apex_at(t), True, acc)
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            r = u[:3]
+            n_r = np.sqrt(np.einsum('ij,ij->j', r, r))
+            cos_psi = None
+            if apex_at is not None:
+                cos_psi = apex_at(t) @ r / n_r
+            rho = model.density(n_r - radius, cos_psi)
+            # Vitesse relative à l'atmosphère : v - omega x r
+            v = u[3:].copy()
+            v[0] += w * u[1]
+            v[1] -= w * u[0]
+            acc -= c * rho * np.sqrt(np.einsum('ij,ij->j', v, v)) * v
+        return kernel
+
+    def jacobian(self, u, t):
+        """Dérivées partielles analytiques de la traînée atmosphérique.
+
+        Avec `a = -c |v| v` et `v = dotr - omega x r` la vitesse relative à
+        l'atmosphère, `da/dv = -c (|v| I + v vᵀ / |v|)`, et la dérivée par
+        rapport à la position s'en déduit par `dv/dr = -[omega x]`, à
+        laquelle s'ajoute `a (grad rho)ᵀ / rho` pour une masse volumique
+        variable.
+        """
+        u = np.asarray(u, dtype=np.float64)
+        rho, gradient = self.density(u[:3], t, derivatives=True)
+        c = 0.5 * self.drag_coeff * self.drag_area / self.mass * rho * 1e3
+        w = self.omega[2]
+        # Vitesse relative à l'atmosphère : v - omega x r
+        v = u[3:].copy()
+        v[0] += w * u[1]
+        v[1] -= w * u[0]
+        n_v = np.sqrt(np.sum(v * v, axis=0))
+        jacobian = np.zeros((3, 6) + u.shape[1:])
+        dv = - c * (n_v * np.eye(3).reshape((3, 3) + (1,) * (v.ndim - 1))
+                    + v[:, np.newaxis] * v[np.newaxis] / n_v)
+        jacobian[:, 3:] = dv
+        # dv/dx = (0, -w, 0) et dv/dy = (w, 0, 0)
+        jacobian[:, 0] = - w * dv[:, 1]
+        jacobian[:, 1] = w * dv[:, 0]
+        if self.atmosphere is not None:
+            jacobian[:, :3] -= (c / rho * n_v * v)[:, np.newaxis] * gradient
+        return jacobian
+
+    def partials(self, u, t, parameters):
+        """Dérivées partielles analytiques de la traînée atmosphérique.
+
+        L'accélération est proportionnelle au coefficient de traînée ; les
+        autres paramètres sont traités par différences finies.
+        """
+        result = super().partials(
+            u, t, [p for p in parameters if p != 'drag_coeff'])
+        if 'drag_coeff' in parameters:
+            result = np.insert(result, list(parameters).index('drag_coeff'),
+                               self.acceleration(u, t) / self.drag_coeff,
+                               axis=1)
+        return result
+
+
+class CelestialBody():
+    """Corps ayant une influence gravitationnelle sur la Terre et l'ISS."""
+    def __init__(self, name, mass, position_callback, t0=None):
+        """Crée un corps à partir de son nom, de sa masse, d'une fonction de
+        position (par exemple `astropy.coordinates.get_sun`) et d'un temps de
+        référence (par défaut, maintenant)."""
+        # Le nom du corps
+        self.name = name
+        # La masse du corps
+        self.mass = mass
+        # La fonction des coordonnées du corps en fonction du temps
+        self.pos = position_callback
+        # Enregistre le temps initial au format `astropy.time.Time`
+        self.t0 = _time(t0)
+        # Cache d'éphémérides éventuel
+        self.ephemeris = None
+
+    def cache(self, t_start=None, t_stop=None, filename=None, **kwargs):
+        """Active le cache d'éphémérides du corps.
+
+        Les positions sont dès lors interpolées par un `EphemerisCache`,
+        dont les paramètres sont transmis par `kwargs`. Les segments couvrant
+        `[t_start, t_stop]` (en secondes depuis `t0`) sont précalculés, après
+        chargement éventuel du fichier de cache `filename`, qui doit avoir
+        été enregistré pour ce corps et couvrir cette période. Retourne le
+        cache.
+        """
+        from isslib.ephemeris import EphemerisCache
+        self.ephemeris = EphemerisCache(self.pos, self.t0, name=self.name,
+                                        **kwargs)
+        if filename is not None:
+            self.ephemeris.load(filename, t_start, t_stop)
+        if t_start is not None and t_stop is not None:
+            self.ephemeris.prefetch(t_start, t_stop)
+        return self.ephemeris
+
+    def position_at(self, t):
+        """Coordonnées cartésiennes kilométriques du corps au temps `t`."""
+        # Interpolation depuis le cache d'éphémérides s'il est activé
+        if self.ephemeris is not None:
+            return self.ephemeris.position_at(t)
+        # Calcul du temps absolu à partir du temps initial
+        import astropy.units as units
+        time = self.t0 + t * units.s
+        # Renvoi des coordonnées (`x`, `y`, `z`)
+        return self.pos(time).represent_as('cartesian').xyz.to(units.km).value
+
+
+class BodyInfluence(Force):
+    """Influence gravitationnelle relative à un autre corps."""
+
+    # Accélération vectorisée sur les trajectoires groupées
+    batched = True
+
+    def __init__(self, body):
+        """Instanciation avec les paramètres du corps tiers concerné."""
+        self.body = body
+
+    @property
+    def name(self):
+        """Nom de la force sous forme de string."""
+        return f"Influence gravitationnelle relative : {self.body.name}"
+
+    @property
+    def formula(self):
+        """Expression de la force au format LaTeX."""
+        # Initale du corps
+        b = self.body.name[0].lower()
+        # Formule avec l'initale du corps pour le vecteur unitaire directeur
+        return (fr"-\frac{{GM_{b}mr}}{{{b}^3}}\big(-\mathbf e_r + "
+                fr"3\mathbf e_{b}(\mathbf e_{b}\mathbf e_r)\big)")
+
+    def acceleration(self, u, t):
+        """EDO Influence relative d'un corps."""
+        # vecteur position
+        r = np.array(u[:3])
+        # position du corps, mise en colonne en mode groupé
+        b = self.body.position_at(t).reshape((3,) + (1,) * (r.ndim - 1))
+        er = r / np.linalg.norm(r, axis=0)
+        eb = b / np.linalg.norm(b)
+        # Expression de l'acceleration résultante de la force
+        return (self.G * self.body.mass * r / np.linalg.norm(b)**3
+                * (- er + 3 * eb * np.sum(eb * er, axis=0)))
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul de l'influence du corps."""
+        gm = self.G * self.body.mass
+        position_at = self.body.position_at
+        if profiler is not None:
+            position_at = profiler.timed(EPHEMERIS, position_at, 'auxiliary')
+        if backend == 'numba':
+            core = _jit(_body_core)
+            return lambda u, t, acc: core(
+                u, np.asarray(position_at(t), dtype=np.float64), gm, acc)
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            r = u[:3]
+            b = position_at(t)
+            n_b = np.sqrt(b @ b)
+            eb = b / n_b
+            er = r / np.sqrt(np.einsum('ij,ij->j', r, r))
+            acc += gm / n_b**3 * r * (3 * eb[:, np.newaxis] * (eb @ er) - er)
+        return kernel
+
+
+# Noyaux de calcul compilés par Numba (backend 'numba' de
+# `ForceSet.compile`) : boucles explicites sur les trajectoires, cumulant
+# l'accélération dans `acc`, de mêmes expressions que les noyaux NumPy.
+
+def _gravity_core(u, mu, acc):
+    """Gravitation terrestre."""
+    for n in range(u.shape[1]):
+        x, y, z = u[0, n], u[1, n], u[2, n]
+        r2 = x*x + y*y + z*z
+        f = mu / (r2 * np.sqrt(r2))
+        acc[0, n] -= f * x
+        acc[1, n] -= f * y
+        acc[2, n] -= f * z
+
+
+def _geopotential_core(u, xyz, mu, k, c20, c22, s22, acc):
+    """Géopotentiel de degré 2, à partir des coordonnées terrestres."""
+    for n in range(u.shape[1]):
+        x, y, z = xyz[0, n], xyz[1, n], xyz[2, n]
+        r2 = x*x + y*y + z*z
+        harmonics = c20 * (3 * z*z / r2 - 1) + (c22 * (x*x - y*y)
+                                                + s22 * 2 * x*y) / r2
+        f = mu / (r2 * np.sqrt(r2)) * (1 + k / r2 * harmonics)
+        for i in range(3):
+            acc[i, n] -= f * u[i, n]
+
+
+def _drag_core(u, c, w, acc):
+    """Traînée atmosphérique."""
+    for n in range(u.shape[1]):
+        vx = u[3, n] + w * u[1, n]
+        vy = u[4, n] - w * u[0, n]
+        vz = u[5, n]
+        f = c * np.sqrt(vx*vx + vy*vy + vz*vz)
+        acc[0, n] -= f * vx
+        acc[1, n] -= f * vy
+        acc[2, n] -= f * vz
+
+
+def _atmosphere_drag_core(u, c, w, radius, h0, inv_step, logs,
+                          half_exponent, apex, bulge, acc):
+    """Traînée atmosphérique, masse volumique interpolée en altitude."""
+    last = logs.shape[1] - 1
+    for n in range(u.shape[1]):
+        n_r = np.sqrt(u[0, n]**2 + u[1, n]**2 + u[2, n]**2)
+        # Intervalle de la grille et position dans l'intervalle, bornés
+        x = min(max((n_r - radius - h0) * inv_step, 0.0), float(last))
+        i = min(int(x), last - 1)
+        f = x - i
+        if bulge:
+            rho_min = np.exp(logs[1, i] + f * (logs[1, i+1] - logs[1, i]))
+            rho_max = np.exp(logs[2, i] + f * (logs[2, i+1] - logs[2, i]))
+            cos_psi = (apex[0]*u[0, n] + apex[1]*u[1, n]
+                       + apex[2]*u[2, n]) / n_r
+            half = max((1 + cos_psi) / 2, 0.0)
+            rho = rho_min + (rho_max - rho_min) * half**half_exponent
+        else:
+            rho = np.exp(logs[0, i] + f * (logs[0, i+1] - logs[0, i]))
+        vx = u[3, n] + w * u[1, n]
+        vy = u[4, n] - w * u[0, n]
+        vz = u[5, n]
+        f = c * rho * np.sqrt(vx*vx + vy*vy + vz*vz)
+        acc[0, n] -= f * vx
+        acc[1, n] -= f * vy
+        acc[2, n] -= f * vz
+
+
+def _body_core(u, b, gm, acc):
+    """Influence gravitationnelle relative d'un corps en `b`."""
+    n_b = np.sqrt(b[0]*b[0] + b[1]*b[1] + b[2]*b[2])
+    f = gm / n_b**3
+    for n in range(u.shape[1]):
+        n_r = np.sqrt(u[0, n]**2 + u[1, n]**2 + u[2, n]**2)
+        dot = (b[0]*u[0, n] + b[1]*u[1, n] + b[2]*u[2, n]) / (n_b * n_r)
+        for i in range(3):
+            acc[i, n] += f * u[i, n] * (3 * b[i] / n_b * dot
+                                        - u[i, n] / n_r)
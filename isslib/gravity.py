@@ -0,0 +1,262 @@
+"""
+isslib.gravity
+==============
+
+Fournit le modèle de géopotentiel en harmoniques sphériques de degré et
+d'ordre quelconques, et la lecture des fichiers de coefficients normalisés.
+"""
+from astropy.time import Time
+import astropy.units as units
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+from isslib.coordinates import celestial2terrestrial_matrices
+from isslib.force import Force
+from isslib.profiling import FRAME
+
+
+def _float(token):
+    """Conversion d'un nombre, éventuellement noté avec un exposant `D`."""
+    return float(token.replace('D', 'E').replace('d', 'e'))
+
+
+def read_gravity_field(filename, max_degree=None):
+    """Lecture d'un fichier de coefficients normalisés du géopotentiel.
+
+    Deux formats sont reconnus : le format ICGEM (`.gfc`, en-tête terminé
+    par `end_of_head` puis lignes `gfc n m C S ...`) et le format en colonnes
+    `n m C S ...` des fichiers EGM96/EGM2008 (exposants `D` acceptés).
+
+    Retourne le quadruplet `(C, S, gm, radius)` où `C` et `S` sont les
+    tableaux triangulaires des coefficients normalisés, `gm` la constante
+    gravitationnelle en km^3.s^-2 et `radius` le rayon de référence en km.
+    Ces deux dernières valeurs sont `None` si le fichier ne les précise pas.
+    """
+    header, n, m, c, s = {}, [], [], [], []
+    with open(filename) as file:
+        # Présence d'un en-tête, déterminée à la première ligne non vide
+        in_header = None
+        for line in file:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if in_header is None:
+                in_header = not tokens[0].isdigit()
+            # En-tête ICGEM, terminé par la ligne `end_of_head`
+            if in_header:
+                in_header = tokens[0] != 'end_of_head'
+                header[tokens[0]] = tokens[1] if len(tokens) > 1 else None
+                continue
+            # Lignes de coefficients
+            if tokens[0] in ('gfc', 'gfct'):
+                tokens = tokens[1:]
+            degree = int(tokens[0])
+            if max_degree is None or degree <= max_degree:
+                n.append(degree)
+                m.append(int(tokens[1]))
+                c.append(_float(tokens[2]))
+                s.append(_float(tokens[3]))
+    # Tableaux triangulaires des coefficients
+    size = max(n) + 1
+    C, S = np.zeros((size, size)), np.zeros((size, size))
+    C[n, m], S[n, m] = c, s
+    # Le terme central est implicite dans certains fichiers
+    C[0, 0] = 1
+    # Constantes de l'en-tête, converties en km
+    gm = header.get('earth_gravity_constant')
+    radius = header.get('radius')
+    return (C, S, float(gm) * 1e-9 if gm else None,
+            float(radius) * 1e-3 if radius else None)
+
+
+class HarmonicGeopotential(Force):
+    """Géopotentiel en harmoniques sphériques de degré et ordre quelconques.
+
+    L'accélération est calculée dans le repère terrestre par les récurrences
+    de Cunningham sur les fonctions `V_nm` et `W_nm` (Montenbruck & Gill,
+    Satellite Orbits, §3.2.4), pour un coût en O(n²) sans aucune expression
+    symbolique. Le terme central `C_00` est inclus : la force remplace donc
+    la gravitation terrestre.
+
+    Les récurrences sont évaluées par degré et vectorisées sur les ordres et
+    sur les positions, dans des tableaux préalloués réutilisés d'un appel à
+    l'autre.
+    """
+
+    # Accélération vectorisée sur les trajectoires groupées
+    batched = True
+
+    def __init__(self, t0=None, rotation=None, field=None, degree=None,
+                 order=None, gm=None, radius=None):
+        """Instancie la force à partir d'un champ de coefficients.
+
+        Paramètres:
+        - t0: date correspondant au temps `t=0` (par défaut, maintenant).
+        - rotation: table de rotation `isslib.coordinates.EarthRotation` ;
+                    à défaut, la rotation exacte d'astropy est calculée à
+                    chaque appel.
+        - field: fichier de coefficients normalisés (voir
+                 `read_gravity_field`) ou couple de tableaux `(C, S)`. Par
+                 défaut, les seuls coefficients C20, C22 et S22.
+        - degree, order: degré et ordre de troncature (par défaut, ceux du
+                         champ), modifiables par la suite avec `truncate`.
+        - gm: constante gravitationnelle en km^3.s^-2 (par défaut, celle du
+              fichier, ou à défaut G fois la masse de la Terre).
+        - radius: rayon de référence des coefficients en km (par défaut,
+                  celui du fichier, ou à défaut 6378.1363 km).
+        """
+        self.t0 = Time(pd.Timestamp.now() if t0 is None else t0)
+        self.rotation = rotation
+        # Coefficients normalisés du champ
+        file_gm = file_radius = None
+        if field is None:
+            C, S = np.zeros((3, 3)), np.zeros((3, 3))
+            C[0, 0], C[2, 0], C[2, 2], S[2, 2] = (1, -484.2e-6, 2.439261e-6,
+                                                  -1.400266e-6)
+        elif isinstance(field, str):
+            C, S, file_gm, file_radius = read_gravity_field(field, degree)
+        else:
+            C, S = (np.asarray(coeffs, dtype=np.float64) for coeffs in field)
+        self.C, self.S = C, S
+        self.gm = gm or file_gm or self.G * self.earth_mass
+        self.radius = radius or file_radius or 6378.1363
+        self.truncate(degree, order)
+
+    @property
+    def name(self):
+        """Nom de la force sous forme de string."""
+        return f"Géopotentiel {self.degree}x{self.order}"
+
+    @property
+    def formula(self):
+        """Expression de la force au format LaTeX."""
+        return (r"\nabla\frac{GM}{r}\sum_{n=0}^{N}\sum_{m=0}^{n}"
+                r"\left(\frac{R}{r}\right)^n\bar P_{nm}(\sin\varphi)"
+                r"\left(\bar C_{nm}\cos m\lambda+\bar S_{nm}\sin m\lambda"
+                r"\right)")
+
+    def truncate(self, degree=None, order=None):
+        """Sélectionne le degré et l'ordre de troncature du champ.
+
+        Les coefficients dénormalisés et pondérés des sommes de Cunningham
+        sont précalculés pour la troncature choisie.
+        """
+        max_degree = len(self.C) - 1
+        self.degree = max_degree if degree is None else min(degree,
+                                                            max_degree)
+        self.order = self.degree if order is None else min(order, self.degree)
+        if self.degree < 0:
+            raise ValueError("degree should be positive.")
+        n_max = self.degree
+        n, m = np.mgrid[0:n_max + 1, 0:n_max + 1]
+        # Coefficients dénormalisés tronqués (nuls pour m > n et m > ordre)
+        keep = (m <= n) & (m <= self.order)
+        # Coefficients de normalisation N_nm, calculés en logarithmes sur le
+        # seul triangle conservé
+        norm = np.zeros(n.shape)
+        nk, mk = n[keep], m[keep]
+        norm[keep] = np.exp(0.5 * (np.log((2 - (mk == 0)) * (2*nk + 1))
+                                   + gammaln(nk - mk + 1)
+                                   - gammaln(nk + mk + 1)))
+        C = self.C[:n_max + 1, :n_max + 1] * norm
+        S = self.S[:n_max + 1, :n_max + 1] * norm
+        # Coefficients pondérés des sommes (m = 0, m >= 1, composante z)
+        fact = ((n - m + 2) * (n - m + 1))[:, 1:]
+        self.__terms = {
+            'c0': C[:, 0], 'c': C[:, 1:], 's': S[:, 1:],
+            'fc': fact * C[:, 1:], 'fs': fact * S[:, 1:],
+            'zc': (n - m + 1) * C, 'zs': (n - m + 1) * S,
+        }
+        # Coefficients des récurrences de Cunningham (degrés jusqu'à n_max+1)
+        k, j = np.mgrid[0:n_max + 2, 0:n_max + 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.__a = np.where(j < k, (2*k - 1) / (k - j), 0)
+            self.__b = np.where(j < k, (k + j - 1) / (k - j), 0)
+        # Les tableaux V et W seront alloués au premier appel
+        self.__V = self.__W = None
+
+    def __cunningham(self, x, y, z):
+        """Fonctions V_nm et W_nm aux positions terrestres `(x, y, z)`."""
+        n_max = self.degree + 1
+        # Allocation (ou réallocation si le nombre de positions change)
+        if self.__V is None or self.__V.shape[-1] != x.shape[-1]:
+            self.__V = np.zeros((n_max + 1, n_max + 1, x.shape[-1]))
+            self.__W = np.zeros((n_max + 1, n_max + 1, x.shape[-1]))
+        V, W = self.__V, self.__W
+        r2 = x**2 + y**2 + z**2
+        R = self.radius
+        x0, y0, z0, rho = R * x / r2, R * y / r2, R * z / r2, R**2 / r2
+        # Termes diagonaux
+        V[0, 0], W[0, 0] = R / np.sqrt(r2), 0
+        for m in range(1, n_max + 1):
+            V[m, m] = (2*m - 1) * (x0 * V[m-1, m-1] - y0 * W[m-1, m-1])
+            W[m, m] = (2*m - 1) * (x0 * W[m-1, m-1] + y0 * V[m-1, m-1])
+        # Termes sous-diagonaux, vectorisés sur les ordres m < n
+        for n in range(1, n_max + 1):
+            a, b = self.__a[n, :n, np.newaxis], self.__b[n, :n, np.newaxis]
+            V[n, :n] = a * z0 * V[n-1, :n]
+            W[n, :n] = a * z0 * W[n-1, :n]
+            if n >= 2:
+                V[n, :n] -= b * rho * V[n-2, :n]
+                W[n, :n] -= b * rho * W[n-2, :n]
+        return V, W
+
+    def terrestrial_acceleration(self, r):
+        """Accélération dans le repère terrestre aux positions terrestres `r`.
+
+        `r` est un tableau `(3, N)` ; l'accélération retournée est de mêmes
+        dimensions.
+        """
+        V, W = self.__cunningham(*r)
+        n_max, k = self.degree, self.__terms
+        # Fonctions de degré n+1 pour les degrés n du champ
+        V1, W1 = V[1:n_max + 2], W[1:n_max + 2]
+
+        def dot(coeffs, functions):
+            """Somme sur les degrés et ordres des produits terme à terme."""
+            return np.tensordot(coeffs, functions, axes=([0, 1], [0, 1]))
+
+        ax = (- k['c0'] @ V1[:, 1]
+              + 0.5 * (dot(-k['c'], V1[:, 2:]) - dot(k['s'], W1[:, 2:])
+                       + dot(k['fc'], V1[:, :n_max])
+                       + dot(k['fs'], W1[:, :n_max])))
+        ay = (- k['c0'] @ W1[:, 1]
+              + 0.5 * (dot(-k['c'], W1[:, 2:]) + dot(k['s'], V1[:, 2:])
+                       - dot(k['fc'], W1[:, :n_max])
+                       + dot(k['fs'], V1[:, :n_max])))
+        az = (dot(-k['zc'], V1[:, :n_max + 1])
+              - dot(k['zs'], W1[:, :n_max + 1]))
+        return self.gm / self.radius**2 * np.array([ax, ay, az])
+
+    def rotation_matrix(self, t):
+        """Matrice de passage du repère céleste au repère terrestre."""
+        if self.rotation is not None:
+            return self.rotation.matrix(t)
+        return celestial2terrestrial_matrices(self.t0 + t * units.s)
+
+    def acceleration(self, u, t):
+        """EDO géopotentiel en harmoniques sphériques."""
+        # vecteur position, mis en colonne en mode simple
+        r = np.asarray(u[:3], dtype=np.float64)
+        r2 = r.reshape(3, -1)
+        # Matrice de passage du repère céleste au repère terrestre
+        M = self.rotation_matrix(t)
+        # Accélération calculée dans le repère terrestre, puis ramenée dans
+        # le repère céleste par la rotation inverse (transposée)
+        a = M.T @ self.terrestrial_acceleration(M @ r2)
+        return a.reshape(r.shape)
+
+    def compile(self, backend='numpy', profiler=None):
+        """Noyau de calcul du géopotentiel (sommes de Cunningham NumPy)."""
+        rotation_matrix = self.rotation_matrix
+        if profiler is not None:
+            rotation_matrix = profiler.timed(FRAME, rotation_matrix,
+                                             'auxiliary')
+        terrestrial_acceleration = self.terrestrial_acceleration
+
+        def kernel(u, t, acc):
+            """Ajout de l'accélération de la force à `acc`."""
+            M = rotation_matrix(t)
+            acc += M.T @ terrestrial_acceleration(M @ u[:3])
+        return kernel
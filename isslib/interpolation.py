@@ -0,0 +1,155 @@
+"""
+isslib.interpolation
+====================
+
+Fournit l'interpolation des états (positions et vitesses) de l'ISS à des
+dates quelconques à partir des enregistrements des fichiers sources.
+"""
+import numpy as np
+import pandas as pd
+
+
+class StateInterpolator:
+    """Interpolation polynomiale par fenêtres glissantes des états de l'ISS.
+
+    Pour chaque intervalle entre deux enregistrements consécutifs, une fenêtre
+    de points voisins est choisie (centrée autant que possible) et les
+    coefficients du polynôme interpolant sont calculés une fois pour toutes.
+    L'évaluation à des dates quelconques se réduit ensuite à une recherche
+    par dichotomie de l'intervalle et à un schéma de Horner vectorisé.
+
+    Deux méthodes sont disponibles :
+    - 'hermite' : interpolation de Hermite des positions, utilisant les
+      positions et les vitesses des points de la fenêtre (polynôme de degré
+      `2*points - 1`), les vitesses étant obtenues par dérivation ;
+    - 'lagrange' : interpolation de Lagrange de degré `order` des positions
+      et des vitesses, indépendamment.
+
+    Les fenêtres ne débordent jamais d'un segment (par exemple un épisode de
+    poussée) : un intervalle séparant deux segments est interpolé par un
+    polynôme de Hermite cubique à partir de ses deux seules extrémités.
+    """
+
+    # Nombre de requêtes évaluées par bloc, pour borner la mémoire utilisée
+    chunk_size = 1 << 16
+
+    def __init__(self, epochs, states, segments=None, method='hermite',
+                 order=None):
+        """Précalcule les polynômes interpolants de chaque intervalle.
+
+        Paramètres:
+        - epochs: tableau croissant des dates des enregistrements.
+        - states: tableau `(N, 6)` des positions et vitesses enregistrées.
+        - segments: identifiants de segment de chaque enregistrement (par
+                    exemple les épisodes de poussée), nuls par défaut.
+        - method: méthode d'interpolation, 'hermite' ou 'lagrange'.
+        - order: nombre de points des fenêtres pour 'hermite' (4 par défaut)
+                 ou degré des polynômes pour 'lagrange' (8 par défaut).
+        """
+        if method not in ('hermite', 'lagrange'):
+            raise ValueError("method should be either 'hermite' or "
+                             "'lagrange'.")
+        self.method = method
+        self.order = order or (4 if method == 'hermite' else 8)
+        self.epochs = np.asarray(epochs, dtype='datetime64[ns]')
+        if len(self.epochs) < 2:
+            raise ValueError("at least two states are required.")
+        # Temps en secondes depuis le premier enregistrement
+        self.t = self.seconds(self.epochs)
+        states = np.asarray(states, dtype=np.float64)
+        segments = (np.zeros(len(self.t), dtype=int) if segments is None
+                    else np.asarray(segments))
+        # Nombre de points des fenêtres
+        points = self.order if method == 'hermite' else self.order + 1
+        # Premier et dernier indices du segment de chaque enregistrement
+        change = np.flatnonzero(segments[1:] != segments[:-1]) + 1
+        bounds = np.concatenate([[0], change, [len(segments)]])
+        seg = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+        seg_start, seg_stop = bounds[seg], bounds[seg + 1] - 1
+        # Fenêtre de chaque intervalle [i, i+1]
+        i = np.arange(len(self.t) - 1)
+        inner = segments[i] == segments[i + 1]
+        size = np.where(inner, np.minimum(points, seg_stop[i] - seg_start[i]
+                                          + 1), 2)
+        start = np.where(inner, np.clip(i - (size // 2 - 1), seg_start[i],
+                                        seg_stop[i] - size + 1), i)
+        hermite = (method == 'hermite') | ~inner
+        # Coefficients (degré, intervalle, composante), calculés par groupes
+        # d'intervalles de même taille de fenêtre et de même méthode
+        degree = 2 * points if method == 'hermite' else points
+        self.coeffs = np.zeros((max(degree, 4), len(i), 6))
+        self.center, self.scale = np.empty(len(i)), np.empty(len(i))
+        for k, h in set(zip(size.tolist(), hermite.tolist())):
+            group = np.flatnonzero((size == k) & (hermite == h))
+            window = start[group, np.newaxis] + np.arange(k)
+            self.__fit(group, window, states, h)
+
+    @staticmethod
+    def seconds(epochs, origin=None):
+        """Temps en secondes de dates quelconques depuis une origine."""
+        epochs = np.asarray(pd.to_datetime(epochs), dtype='datetime64[ns]')
+        origin = epochs.flat[0] if origin is None else origin
+        return (epochs - origin) / np.timedelta64(1, 's')
+
+    def __fit(self, group, window, states, hermite):
+        """Calcul des coefficients d'un groupe d'intervalles de même fenêtre.
+
+        Les polynômes sont exprimés dans la variable réduite
+        `tau = (t - center) / scale`, comprise dans [-1, 1] sur la fenêtre.
+        """
+        t = self.t[window]
+        center = (t[:, 0] + t[:, -1]) / 2
+        scale = (t[:, -1] - t[:, 0]) / 2
+        tau = (t - center[:, np.newaxis]) / scale[:, np.newaxis]
+        y = states[window]
+        k = window.shape[1]
+        if hermite:
+            # Positions et dérivées (vitesses) aux points de la fenêtre
+            d = np.arange(2 * k)
+            A = np.concatenate([
+                tau[..., np.newaxis] ** d,
+                d * tau[..., np.newaxis] ** np.maximum(d - 1, 0)
+                / scale[:, np.newaxis, np.newaxis]], axis=1)
+            b = np.concatenate([y[..., :3], y[..., 3:]], axis=1)
+            pos = np.linalg.solve(A, b)
+            # Coefficients des vitesses par dérivation des positions
+            vel = d[1:, np.newaxis] * pos[:, 1:] / scale[:, np.newaxis,
+                                                         np.newaxis]
+            coeffs = np.zeros((len(group), 2 * k, 6))
+            coeffs[..., :3], coeffs[:, :-1, 3:] = pos, vel
+        else:
+            # Interpolation de Lagrange de toutes les composantes
+            A = tau[..., np.newaxis] ** np.arange(k)
+            coeffs = np.linalg.solve(A, y)
+        self.coeffs[:coeffs.shape[1], group] = coeffs.transpose(1, 0, 2)
+        self.center[group], self.scale[group] = center, scale
+
+    def __call__(self, epochs):
+        """Etats `(6, N)` interpolés aux dates `epochs`.
+
+        Les dates hors de la période des enregistrements donnent des `nan`.
+        """
+        t = np.atleast_1d(self.seconds(epochs, self.epochs[0]))
+        states = np.full((6, len(t)), np.nan)
+        for first in range(0, len(t), self.chunk_size):
+            chunk = slice(first, first + self.chunk_size)
+            states[:, chunk] = self.__evaluate(t[chunk])
+        return states
+
+    def __evaluate(self, t):
+        """Evaluation des polynômes interpolants aux temps `t` (secondes)."""
+        # Intervalle contenant chaque temps
+        i = np.clip(np.searchsorted(self.t, t, side='right') - 1,
+                    0, len(self.center) - 1)
+        tau = ((t - self.center[i]) / self.scale[i])[:, np.newaxis]
+        # Schéma de Horner
+        acc = self.coeffs[-1][i]
+        for coeffs in self.coeffs[-2::-1]:
+            acc = acc * tau + coeffs[i]
+        valid = (t >= self.t[0]) & (t <= self.t[-1])
+        return np.where(valid, acc.T, np.nan)
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        return (f"StateInterpolator({self.method}, order={self.order}) "
+                f"over {len(self.t)} states")
@@ -4,17 +4,20 @@ isslib.position
 
 Fournit la classe principale de gestion des positions de l'ISS.
 """
+import hashlib
+import io
 import os
 import re
-import requests
 
 import numpy as np
 import pandas as pd
 
+from isslib.interpolation import StateInterpolator
+
 
 class ISS_Position:
     """Classe d'extraction des données de position de l'ISS."""
-    def __init__(self, filename=None, force_download=False):
+    def __init__(self, filename=None, force_download=False, cache=True):
         """Coordonnées de l'ISS extraites d'un fichier source.
 
         La lecture s'effectue depuis un fichier local si spécifié. Dans le cas
@@ -23,51 +26,122 @@ class ISS_Position:
 
         Paramètres:
         - filename: le fichier local à utiliser comme source de données.
-        - force_download: force le téléchargement du fichier même s'il existe
-                          déjà en local.
+        - force_download: revalide le fichier local existant auprès du
+                          serveur, et le télécharge à nouveau s'il a changé
+                          (voir `isslib.download.Downloader`).
+        - cache: utilise (et crée au besoin) un cache binaire du fichier
+                 analysé, enregistré à côté de celui-ci, pour des relectures
+                 quasi instantanées.
         """
         if not filename:
             # Pas de fichié spécifié, génère le nom de fichier local du jour
             datetime = pd.Timestamp.today().strftime('%Y%m%d')
             filename = os.path.join("data", f"ISS.OEM_J2K_EPH_{datetime}.txt")
-            # Télécharge le fichier du jour si absent ou téléchargement forcé
+            # Télécharge le fichier du jour s'il est absent, ou le revalide
+            # auprès du serveur si le téléchargement est forcé
             if force_download or not os.path.exists(filename):
-                self.__download(filename)
+                # Import différé : requests n'est nécessaire qu'ici
+                from isslib.download import CURRENT_URL, Downloader
+                with Downloader(os.path.dirname(filename)) as downloader:
+                    downloader.fetch(CURRENT_URL, filename, force_download)
         # Parse le contenu du fichier
-        self.__parse_source(filename)
-
-    def __download(self, filename):
-        """Télécharge le fichier de coordonnées de l'ISS du jour."""
-        # Permalien du fichier depuis le bucket public de la NASA
-        url = ("https://nasa-public-data.s3.amazonaws.com/iss-coords/current/"
-               "ISS_OEM/ISS.OEM_J2K_EPH.txt")
-        # Téléchargement en mémoire du fichier
-        myfile = requests.get(url)
-        # Ecriture en fichier local
-        with open(filename, 'wb') as file:
-            file.write(myfile.content)
-
-    def __parse_source(self, filename):
-        """Analyse syntaxique du fichier."""
-        with open(filename) as file:
-            source_lines = file.readlines()
+        self.__parse_source(filename, cache)
+
+    def __parse_source(self, filename, cache):
+        """Analyse syntaxique du fichier, ou lecture de son cache binaire."""
+        cache_file = f"{filename}.cache.npz"
+        source = self.__read_cache(filename, cache_file) if cache else None
+        if source is None:
+            source = self.__read_source(filename)
+            if cache:
+                self.__write_cache(filename, cache_file, *source)
+        header_lines, datetimes, coords = source
         # Extraction des métadonnées
-        self.__parse_source_meta(source_lines)
+        self.__parse_source_meta(header_lines)
         # Extraction des commentaires
-        self.__parse_source_comments(source_lines)
+        self.__parse_source_comments(header_lines)
         # Extraction des données
-        self.__parse_data(filename)
+        self.__parse_data(datetimes, coords)
+
+    @staticmethod
+    def __read_source(filename):
+        """Lecture du fichier en une passe : en-tête, puis bloc de données.
+
+        Retourne la liste des lignes d'en-tête (métadonnées et commentaires),
+        le tableau des dates et le tableau `(N, 6)` des coordonnées.
+        """
+        header_lines = []
+        with open(filename) as file:
+            # Les lignes d'en-tête précèdent la première ligne datée
+            line = ''
+            for line in file:
+                if line[:1].isdigit():
+                    break
+                header_lines.append(line)
+            # Lecture groupée des lignes de données restantes
+            columns = ['datetime', 'x', 'y', 'z', 'vx', 'vy', 'vz']
+            data = pd.read_csv(io.StringIO(line + file.read()), sep=" ",
+                               names=columns, dtype={'datetime': object})
+        # Conversion vectorisée des dates et tableau des coordonnées
+        return (header_lines,
+                data['datetime'].to_numpy().astype('datetime64[ns]'),
+                data[columns[1:]].to_numpy(dtype=np.float64))
+
+    @staticmethod
+    def __file_key(filename):
+        """Taille et date de modification du fichier, clé rapide du cache."""
+        stat = os.stat(filename)
+        return np.array([stat.st_size, stat.st_mtime_ns])
+
+    @staticmethod
+    def __file_hash(filename):
+        """Empreinte SHA-1 du contenu du fichier."""
+        with open(filename, 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+    def __read_cache(self, filename, cache_file):
+        """Lecture du cache binaire, s'il correspond au fichier source.
+
+        Le cache est valide si la taille et la date de modification du
+        fichier sont inchangées, ou à défaut si son empreinte est identique.
+        """
+        try:
+            with np.load(cache_file) as npz:
+                if not (np.array_equal(npz['key'], self.__file_key(filename))
+                        or npz['hash'] == self.__file_hash(filename)):
+                    return None
+                return (list(npz['header_lines']), npz['datetimes'],
+                        npz['coords'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def __write_cache(self, filename, cache_file, header_lines, datetimes,
+                      coords):
+        """Ecriture atomique du cache binaire à côté du fichier source."""
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as file:
+                np.savez(file, key=self.__file_key(filename),
+                         hash=self.__file_hash(filename),
+                         header_lines=np.array(header_lines),
+                         datetimes=datetimes, coords=coords)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            # Répertoire en lecture seule : le cache est simplement ignoré
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
 
     def __parse_source_meta(self, source_lines):
         """Extraction des métadonnées du fichier."""
-        # Détection des lignes de métadonnées
-        meta = slice(source_lines.index('META_START\n')+1,
-                     source_lines.index('META_STOP\n'))
+        # Détection des lignes d'en-tête et de métadonnées
+        start = source_lines.index('META_START\n')
+        header = [line for line in source_lines[:start] if '=' in line]
+        meta = source_lines[start+1:source_lines.index('META_STOP\n')]
         # Enregistrement des métadonnées dans un dictionnaire
         self.meta = {
             key.strip(): pd.to_datetime(value.strip())
-            if key.strip().endswith('_TIME') else value.strip()
-            for line in source_lines[meta]
+            if key.strip().endswith(('_TIME', '_DATE')) else value.strip()
+            for line in header + meta
             for (key, value) in [line.split('=', 1)]
         }
 
@@ -76,8 +150,6 @@ class ISS_Position:
         # Sélection des lignes de commentaires
         comments = [line for line in source_lines
                     if line.startswith("COMMENT")]
-        # Index de la dernière ligne de commentaires
-        self.__last_comment_index = source_lines.index(comments[-1])
         # Enregistrement des commentaires dans une liste
         self.comments = [comment[7:].strip() for comment in comments]
         # Recherche par motif des metadonnées inclues dans les commentaires
@@ -86,41 +158,28 @@ class ISS_Position:
         # Ajout de ces métadonnées aux dictonnaire des métadonnées
         self.meta.update({match[0]: float(match[1]) for match in md_comments})
 
-    def __parse_data(self, filename):
-        """Extraction des données du fichier."""
-        # Enregistrement des données dans un DataFrame à partir des lignes
-        # suivant le dernier commentaire
-        columns = ['datetime', 'x', 'y', 'z', 'vx', 'vy', 'vz']
-        self.data = pd.read_csv(filename, sep=" ", names=columns,
-                                skiprows=self.__last_comment_index+1,
-                                parse_dates=[0], infer_datetime_format=True)
+    def __parse_data(self, datetimes, coords):
+        """Construction du DataFrame des données."""
+        columns = ['x', 'y', 'z', 'vx', 'vy', 'vz']
+        self.data = pd.DataFrame(coords, columns=columns)
+        self.data.insert(0, 'datetime', datetimes)
         # Ajoute les annotations de poussée
         self.__add_thrust_metadata()
+        # Interpolateurs des états, construits à la demande
+        self.__interpolators = {}
 
     def __add_thrust_metadata(self):
         """Ajout des annotation de poussé et épisodes de poussée."""
         # Les enregistrements datant de deux secondes après leur précédent
         # sont marqués en tant que poussée
-        self.data['on_thrust'] = np.isclose(
-            self.data.diff().datetime.dt.total_seconds(), 2)
-        # Initialisation des valeurs d'épisode de poussée
-        self.__current_state = self.data.iloc[0]['on_thrust']
-        self.__current_tid = 0
-        # Un épsiode est une séquence contiguë d'état de poussée
-        self.data['thrust_episode'] = self.data['on_thrust'].apply(
-            self.__thrust_episode)
-        # Suppression des marqueurs inutiles
-        del self.__current_state, self.__current_tid
-
-    def __thrust_episode(self, on_thrust):
-        """Parours de proche en proche des états de poussée."""
-        # Si l'état actuel est différent du dernier état enregistré
-        if on_thrust != self.__current_state:
-            # Changement d'état et d'identifiant d'épisode.
-            self.__current_state = on_thrust
-            self.__current_tid += 1
-        # Renvoi de l'indentifiant actuel
-        return self.__current_tid
+        delta = np.diff(self.data['datetime'].to_numpy()) / np.timedelta64(
+            1, 's')
+        on_thrust = np.concatenate([[False], np.isclose(delta, 2)])
+        self.data['on_thrust'] = on_thrust
+        # Un épsiode est une séquence contiguë d'état de poussée : son
+        # identifiant est le nombre cumulé de changements d'état
+        self.data['thrust_episode'] = np.concatenate(
+            [[0], np.cumsum(on_thrust[1:] != on_thrust[:-1])])
 
     def get_metadata(self, key=None):
         """Accès aux métadonnées.
@@ -144,6 +203,33 @@ class ISS_Position:
         """Retourne le DataFrame des données"""
         return self.data
 
+    def interpolator(self, method='hermite', order=None):
+        """Interpolateur des états, construit au premier appel puis réutilisé.
+
+        Les fenêtres d'interpolation ne débordent jamais d'un épisode de
+        poussée (voir `isslib.interpolation.StateInterpolator`).
+        """
+        key = (method, order)
+        if key not in self.__interpolators:
+            columns = ['x', 'y', 'z', 'vx', 'vy', 'vz']
+            self.__interpolators[key] = StateInterpolator(
+                self.data['datetime'].to_numpy(),
+                self.data[columns].to_numpy(dtype=np.float64),
+                self.data['thrust_episode'].to_numpy(), method, order)
+        return self.__interpolators[key]
+
+    def state_at(self, epochs, method='hermite', order=None):
+        """Etats `(6, N)` de l'ISS interpolés aux dates `epochs`.
+
+        Paramètres:
+        - epochs: date ou tableau de dates (tout format accepté par
+                  `pandas.to_datetime`).
+        - method: méthode d'interpolation, 'hermite' ou 'lagrange'.
+        - order: nombre de points des fenêtres pour 'hermite' ou degré des
+                 polynômes pour 'lagrange' (voir `StateInterpolator`).
+        """
+        return self.interpolator(method, order)(epochs)
+
     def __repr__(self):
         """Représentation en string de l'objet."""
         start, stop = self.meta['START_TIME'], self.meta['STOP_TIME']
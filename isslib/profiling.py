@@ -0,0 +1,140 @@
+"""
+isslib.profiling
+================
+
+Fournit l'instrumentation des résolutions d'un jeu de forces : nombres
+d'appels et durées par force, durées des changements de repère et des
+éphémérides, nombres de pas et débits.
+"""
+from collections import defaultdict
+import time
+
+# Catégories de calculs auxiliaires des forces, chronométrés séparément
+FRAME = "Changement de repère"
+EPHEMERIS = "Ephémérides"
+DERIVATIVE = "Dérivée"
+
+
+class Profiler:
+    """Collecteur de mesures des résolutions d'un `ForceSet`.
+
+    L'instrumentation est activée en affectant un profileur à l'attribut
+    `profiler` d'un jeu de forces : les noyaux de calcul compilés lors des
+    résolutions suivantes sont alors enveloppés de chronomètres. En
+    l'absence de profileur, aucune enveloppe n'est créée et le coût est nul.
+
+    Les crochets (`hooks`) sont des fonctions `hook(event, metrics)`
+    appelées à chaque événement : 'chunk' (bloc produit par
+    `ForceSet.stream`), 'interrupt' (trajectoire interrompue) et 'end'
+    (fin de résolution), avec le dictionnaire `summary()` complété des
+    informations de l'événement. Ils permettent d'exporter les mesures des
+    longs calculs au fil de l'eau.
+    """
+
+    def __init__(self, hooks=()):
+        """Instancie un profileur vide.
+
+        Paramètres:
+        - hooks: liste de fonctions `hook(event, metrics)`.
+        """
+        self.hooks = list(hooks)
+        self.kinds = {}
+        self.calls = defaultdict(int)
+        self.time = defaultdict(float)
+        self.counters = defaultdict(float)
+
+    def reset(self):
+        """Remise à zéro des mesures, les enveloppes restant valides."""
+        self.calls.clear()
+        self.time.clear()
+        self.counters.clear()
+
+    def timed(self, key, function, kind='force'):
+        """Enveloppe `function` d'un chronomètre cumulé sous la clé `key`.
+
+        Paramètres:
+        - key: nom de la mesure (nom de la force ou catégorie).
+        - function: fonction chronométrée.
+        - kind: nature de la mesure, 'force', 'auxiliary' (changements de
+                repère, éphémérides) ou 'total' (dérivée complète).
+        """
+        self.kinds[key] = kind
+        calls, elapsed = self.calls, self.time
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            """Appel chronométré."""
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed[key] += perf_counter() - start
+                calls[key] += 1
+        return wrapper
+
+    def add_run(self, stats):
+        """Cumul des statistiques d'une résolution (`ForceSet.stats`)."""
+        self.counters['runs'] += 1
+        for key in ('nsteps', 'nfev', 'nrejected', 'wall_time'):
+            self.counters[key] += stats.get(key, 0)
+
+    def emit(self, event, **info):
+        """Appel des crochets pour un événement."""
+        if self.hooks:
+            metrics = self.summary()
+            metrics.update(info)
+            for hook in self.hooks:
+                hook(event, metrics)
+
+    def summary(self):
+        """Dictionnaire des mesures globales.
+
+        Les durées sont en secondes : `derivative_time` est la durée totale
+        des calculs de dérivée, dont `auxiliary_time` en changements de
+        repère et éphémérides et `arithmetic_time` pour le reste des calculs
+        des forces ; `integrator_time` est la durée propre de l'intégrateur.
+        Les débits sont exprimés par seconde de résolution.
+        """
+        c = self.counters
+        derivative = self.time.get(DERIVATIVE, 0.0)
+        auxiliary = sum(duration for key, duration in self.time.items()
+                        if self.kinds.get(key) == 'auxiliary')
+        wall = c['wall_time']
+        return {
+            'runs': int(c['runs']), 'nsteps': int(c['nsteps']),
+            'nrejected': int(c['nrejected']), 'nfev': int(c['nfev']),
+            'wall_time': wall, 'derivative_time': derivative,
+            'auxiliary_time': auxiliary,
+            'arithmetic_time': derivative - auxiliary,
+            'integrator_time': wall - derivative if derivative else None,
+            'steps_per_second': c['nsteps'] / wall if wall else None,
+            'fev_per_second': c['nfev'] / wall if wall else None,
+        }
+
+    def report(self):
+        """DataFrame des mesures par force et par catégorie de calcul.
+
+        Colonnes : nature de la mesure, nombre d'appels, durée cumulée (s),
+        durée moyenne par appel (µs) et part de la durée des calculs de
+        dérivée (%).
+        """
+        total = self.time.get(DERIVATIVE) or sum(
+            duration for key, duration in self.time.items()
+            if self.kinds.get(key) == 'force')
+        # Import différé : pandas n'est chargé que pour le rapport
+        import pandas as pd
+        df = pd.DataFrame({
+            'kind': pd.Series(self.kinds),
+            'calls': pd.Series(self.calls, dtype=int),
+            'time': pd.Series(self.time, dtype=float),
+        }).dropna(subset=['time'])
+        df['calls'] = df['calls'].astype(int)
+        df['time_per_call'] = df['time'] / df['calls'] * 1e6
+        df['share'] = df['time'] / total * 100 if total else float('nan')
+        return df.sort_values('time', ascending=False)
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        s = self.summary()
+        return (f"Profiler of {s['runs']} runs: {s['nsteps']} steps, "
+                f"{s['nfev']} evaluations in {s['wall_time']:.3f} s")
@@ -0,0 +1,170 @@
+"""
+isslib.store
+============
+
+Fournit le stockage sur disque, par blocs et avec points de reprise, des
+résultats de propagation, ainsi que leur exploitation incrémentale.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class PropagationStore:
+    """Stockage sur disque des solutions d'une propagation par blocs.
+
+    Le stockage est un répertoire contenant les paramètres de la grille
+    temporelle (`meta.json`), les tableaux des temps (`t.npy`) et des
+    solutions (`states.npy`, de dimensions `(num_points,) + shape`) ouverts
+    en mémoire partagée (`numpy.memmap`), et un point de reprise
+    (`checkpoint.json`) indiquant le nombre de points validés. Le point de
+    reprise n'est réécrit, atomiquement, qu'une fois un bloc entièrement
+    enregistré : un calcul interrompu reprend au dernier bloc complet (voir
+    `ForceSet.solve_to_store`).
+    """
+
+    def __init__(self, directory, t_start=None, t_stop=None, t_step=None,
+                 shape=(6,)):
+        """Crée un stockage, ou rouvre un stockage existant.
+
+        Paramètres:
+        - directory: répertoire du stockage.
+        - t_start, t_stop, t_step: grille temporelle, comme pour
+                                   `ForceSet.solve` (facultatifs pour
+                                   rouvrir un stockage existant).
+        - shape: dimensions des coordonnées, `(6,)` ou groupées `(6, N)`.
+        """
+        self.directory = directory
+        meta = {'t_start': t_start, 't_stop': t_stop, 't_step': t_step,
+                'shape': list(shape)}
+        stored = self.__read_json('meta.json')
+        if stored is None:
+            if None in (t_start, t_stop, t_step):
+                raise ValueError("t_start, t_stop and t_step are required "
+                                 "to create a store.")
+            self.__create(meta)
+        elif t_start is not None and stored != meta:
+            raise ValueError("store parameters do not match the existing "
+                             f"store in {directory}.")
+        meta = self.__read_json('meta.json')
+        self.t_start, self.t_stop, self.t_step = (
+            meta['t_start'], meta['t_stop'], meta['t_step'])
+        self.shape = tuple(meta['shape'])
+        # Tableaux en mémoire partagée et point de reprise
+        self.t = np.load(self.__path('t.npy'), mmap_mode='r+')
+        self.states = np.load(self.__path('states.npy'), mmap_mode='r+')
+        checkpoint = self.__read_json('checkpoint.json')
+        self.count, self.finished = checkpoint['count'], checkpoint['finished']
+
+    def __path(self, name):
+        """Chemin d'un fichier du stockage."""
+        return os.path.join(self.directory, name)
+
+    def __read_json(self, name):
+        """Lecture d'un fichier JSON du stockage (`None` s'il est absent)."""
+        try:
+            with open(self.__path(name)) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __write_json(self, name, content):
+        """Ecriture atomique d'un fichier JSON du stockage."""
+        tmp_file = self.__path(f"{name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as file:
+            json.dump(content, file)
+        os.replace(tmp_file, self.__path(name))
+
+    def __create(self, meta):
+        """Création des fichiers d'un stockage vide."""
+        os.makedirs(self.directory, exist_ok=True)
+        num_points = int((meta['t_stop'] - meta['t_start'])
+                         / meta['t_step']) + 1
+        # Fichiers préalloués à la taille finale, remplis à la demande
+        for name, shape in (('t.npy', (num_points,)),
+                            ('states.npy', (num_points,) + tuple(
+                                meta['shape']))):
+            np.lib.format.open_memmap(self.__path(name), mode='w+',
+                                      dtype=np.float64, shape=shape).flush()
+        self.__write_json('checkpoint.json', {'count': 0, 'finished': False})
+        # Les paramètres sont écrits en dernier : ils valident le stockage
+        self.__write_json('meta.json', meta)
+
+    def append(self, t, v):
+        """Ajoute un bloc `(t, v)` produit par `ForceSet.stream`.
+
+        Les solutions `v` sont de dimensions `shape + (n,)`. Le point de
+        reprise est mis à jour une fois les données écrites sur disque.
+        """
+        n = len(t)
+        if n == 0:
+            return
+        if self.count + n > len(self.t):
+            raise ValueError("chunk exceeds the store time grid.")
+        self.t[self.count:self.count + n] = t
+        self.states[self.count:self.count + n] = np.moveaxis(v, -1, 0)
+        self.t.flush()
+        self.states.flush()
+        self.count += n
+        self.__write_json('checkpoint.json', {'count': self.count,
+                                              'finished': False})
+
+    def finish(self):
+        """Marque la propagation comme terminée (ou interrompue)."""
+        self.finished = True
+        self.__write_json('checkpoint.json', {'count': self.count,
+                                              'finished': True})
+
+    def get_data(self, start=0, stop=None):
+        """Temps et solutions validés d'indices `[start, stop[`.
+
+        Les solutions sont retournées au format de `ForceSet.solve`, de
+        dimensions `shape + (n,)`.
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        return (np.array(self.t[start:stop]),
+                np.moveaxis(np.array(self.states[start:stop]), 0, -1))
+
+    def chunks(self, chunk_size=1024):
+        """Parcours des résultats validés par blocs `(t, v)`.
+
+        Seuls les blocs parcourus sont lus depuis le disque.
+        """
+        for start in range(0, self.count, chunk_size):
+            yield self.get_data(start, start + chunk_size)
+
+    def __len__(self):
+        """Nombre de points validés."""
+        return self.count
+
+    def __repr__(self):
+        """Représentation en string de l'objet."""
+        state = "finished" if self.finished else "in progress"
+        return (f"PropagationStore of {self.count}/{len(self.t)} points "
+                f"({state}) in {self.directory}")
+
+
+def residuals(chunks, reference, t0):
+    """Résidus de position, bloc par bloc, d'une propagation aux données.
+
+    Pour chaque bloc `(t, v)` (produit par `ForceSet.stream` ou
+    `PropagationStore.chunks`), les positions de référence sont interpolées
+    aux mêmes dates par `reference.state_at` (`ISS_Position` ou
+    `ISS_Archive`) et le générateur produit le couple `(t, r)` où `r` est la
+    norme en km de l'écart de position, de dimensions `v.shape[1:]`.
+
+    Paramètres:
+    - chunks: itérable de blocs `(t, v)`, `t` en secondes depuis `t0`.
+    - reference: source des positions de référence.
+    - t0: date correspondant au temps `t=0`.
+    """
+    t0 = pd.Timestamp(t0)
+    for t, v in chunks:
+        # Dates du bloc et positions de référence interpolées
+        epochs = t0 + pd.to_timedelta(t, unit='s')
+        source = reference.state_at(epochs)[:3]
+        # Mise en colonne des références en mode groupé
+        source = source.reshape((3,) + (1,) * (v.ndim - 2) + (len(t),))
+        yield t, np.linalg.norm(v[:3] - source, axis=0)
@@ -5,16 +5,99 @@ isslib.visualization
 Fournit les contextes de représentation graphiques des données.
 """
 from contextlib import contextmanager
+from functools import lru_cache
 import os
 
 import numpy as np
 import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 
+from isslib.coordinates import worldmap_path
 
-@contextmanager
-def orbital():
-    """Globle terrestre pour un affichage 3D de positions orbitales."""
+
+def decimate(points, tolerance, chunk=256):
+    """Indices des points conservés d'une trajectoire simplifiée.
+
+    Algorithme de Douglas-Peucker : la trajectoire `points`, tableau
+    `(D, N)` (par exemple des positions en km, ou des longitudes/latitudes
+    en degrés), est approchée par une ligne brisée dont aucun point omis ne
+    s'écarte de plus de `tolerance` (dans l'unité des points). Les segments
+    sont subdivisés niveau par niveau : à chaque niveau, les distances de
+    tous les points à leur segment sont calculées en une seule opération
+    vectorisée, et le point le plus éloigné de chaque segment hors
+    tolérance est conservé. Les segments initiaux comptent `chunk` points,
+    ce qui borne le nombre de niveaux pour les trajectoires périodiques
+    (sans affecter la tolérance, au prix d'un point conservé par segment
+    initial).
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = points.shape[1]
+    # Trajectoires trop courtes pour être simplifiées
+    if n < 3:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[::chunk] = True
+    keep[-1] = True
+    while True:
+        kept = np.flatnonzero(keep)
+        # Extrémités du segment de chaque point (le dernier point est
+        # rattaché au dernier segment)
+        segment = np.minimum(np.searchsorted(kept, np.arange(n),
+                                             side='right') - 1, len(kept) - 2)
+        a = points[:, kept[segment]]
+        d = points[:, kept[segment + 1]] - a
+        inner = points - a
+        # Distances des points à leur segment [a, a+d]
+        length = np.einsum('ij,ij->j', d, d)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along = np.clip(np.einsum('ij,ij->j', d, inner) / length, 0, 1)
+        along[length == 0] = 0
+        dist2 = np.sum((inner - along * d)**2, axis=0)
+        # Distance maximale de chaque segment, puis premier point l'atteignant
+        farthest = np.maximum.reduceat(dist2, kept[:-1])
+        candidates = np.flatnonzero((dist2 == farthest[segment])
+                                    & (farthest[segment] > tolerance**2))
+        if not len(candidates):
+            return kept
+        _, first = np.unique(segment[candidates], return_index=True)
+        keep[candidates[first]] = True
+
+
+def _decimated(size, keep, kwargs):
+    """Paramètres de trace restreints aux points conservés `keep`.
+
+    Les valeurs par point (tableaux de longueur `size`, par exemple une
+    couleur par position) sont échantillonnées comme les coordonnées.
+    """
+    return {key: (np.asarray(value)[keep]
+                  if np.ndim(value) == 1 and len(value) == size else value)
+            for key, value in kwargs.items()}
+
+
+def trajectory3d(x, y, z, tolerance=10.0, **kwargs):
+    """Trace 3D d'une trajectoire simplifiée à `tolerance` km près.
+
+    Retourne une `go.Scatter3d` à ajouter à la figure de `orbital`
+    (`fig.add_trace`), dont les paramètres `kwargs` sont ceux de
+    `go.Scatter3d`. La tolérance par défaut est inférieure à la taille d'un
+    pixel pour une vue complète du globe : une trajectoire de plusieurs
+    jours à haute résolution est réduite à quelques milliers de points sans
+    écart visible.
+    """
+    xyz = np.array([x, y, z], dtype=np.float64)
+    keep = decimate(xyz, tolerance)
+    x, y, z = xyz[:, keep]
+    return go.Scatter3d(x=x, y=y, z=z,
+                        **_decimated(xyz.shape[1], keep, kwargs))
+
+
+@lru_cache(maxsize=None)
+def _earth():
+    """Figure du globe terrestre, construite une seule fois.
+
+    Les méridiens sont réunis en une unique trace, interrompue entre deux
+    méridiens par des valeurs `nan`.
+    """
     # Rayon terrestre moyen volumétrique
     earth_radius = 6371  # km
     # Découpage en 24 méridiens et 60 parallèles (choix cosmétique)
@@ -22,15 +105,16 @@ def orbital():
     # Surface de la Terre
     x, y, z = np.array([np.cos(u) * np.sin(v),
                         np.sin(u) * np.sin(v), np.cos(v)]) * earth_radius
-    # Représentation des méridiens
-    meridians = [go.Scatter3d(x=xx, y=yy, z=zz, line_width=1,
-                              line_color="cadetblue",
-                              opacity=1, showlegend=False, hoverinfo='skip')
-                 for xx, yy, zz in zip(x, y, z)]
+    # Représentation des méridiens, en une seule trace
+    gap = np.full((24, 1), np.nan)
+    meridians = go.Scatter3d(x=np.hstack([x, gap]).ravel(),
+                             y=np.hstack([y, gap]).ravel(),
+                             z=np.hstack([z, gap]).ravel(),
+                             mode="lines", line_width=1,
+                             line_color="cadetblue", connectgaps=False,
+                             opacity=1, showlegend=False, hoverinfo='skip')
     # Représentation de la surface de la Terre
-    surface = go.Surface(x=earth_radius * np.cos(u)*np.sin(v),
-                         y=earth_radius * np.sin(u)*np.sin(v),
-                         z=earth_radius * np.cos(v),
+    surface = go.Surface(x=x, y=y, z=z,
                          opacity=0.7, colorscale="Blues_r", showscale=False,
                          hoverinfo='none')
     # Ajout d'un axe de rotation (pour une meilleure compréhension du rendu)
@@ -38,7 +122,7 @@ def orbital():
                         z=[-1.2*earth_radius, 1.2*earth_radius], line_width=2,
                         line_color='gray', opacity=0.6, showlegend=False)
     # Chargement de la représentation de la Terre comme figure de base
-    fig = go.Figure(meridians + [axis, surface])
+    fig = go.Figure([meridians, axis, surface])
     # Template pour afficher les scatter3d en mode ligne par défaut
     orbit_template = go.layout.Template()
     orbit_template.data.scatter3d = [go.Scatter3d(mode="lines", line_width=3,
@@ -52,6 +136,18 @@ def orbital():
                                         eye=dict(x=1.25, y=0, z=0)),
                       scene_dragmode='orbit', margin=dict(l=0, r=0, b=0, t=50),
                       template=orbit_template)
+    return fig
+
+
+@contextmanager
+def orbital():
+    """Globle terrestre pour un affichage 3D de positions orbitales.
+
+    La figure fournie est une copie du globe construit au premier appel.
+    Les longues trajectoires gagnent à être ajoutées simplifiées, par
+    `fig.add_trace(trajectory3d(x, y, z))`.
+    """
+    fig = go.Figure(_earth())
     # Renvoi de la figure pour utilisation
     yield fig
     # Affichage de la représentation
@@ -86,3 +182,21 @@ def worldmap(transparency=.5):
     yield
     # Affichage en sortie du `with`
     plt.show()
+
+
+def ground_track(longitudes, latitudes, fmt='-', tolerance=0.05, **kwargs):
+    """Trace au sol simplifiée, en un seul appel à `plt.plot`.
+
+    A utiliser dans le contexte de `worldmap`. La trace est simplifiée à
+    `tolerance` degrés près (voir `decimate`) sur les longitudes déroulées,
+    avant son découpage en traces planisphère (voir
+    `isslib.coordinates.worldmap_path`). Les paramètres `fmt` et `kwargs`
+    sont ceux de `plt.plot`.
+    """
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    # Longitudes continues, sans saut au passage de l'antiméridien
+    unwrapped = np.unwrap(longitudes, period=360)
+    keep = decimate(np.array([unwrapped, latitudes]), tolerance)
+    lon = (unwrapped[keep] + 180) % 360 - 180
+    return plt.plot(*worldmap_path(lon, latitudes[keep]), fmt, **kwargs)